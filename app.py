@@ -1,67 +1,75 @@
-from flask import Flask, render_template, request, jsonify
+import atexit
+import bisect
+import click
+import contextlib
+import csv
+import functools
+import getpass
+from flask import Flask, Response, g, has_request_context, render_template, request, jsonify, url_for
 import re
+import io
+import gzip
+import zlib
+import os
+import sys
 import json
+import multiprocessing
+import operator
+import queue
+import random
+import secrets
+import time
+import sqlite3
+import hashlib
+import hmac
+import itertools
+import tempfile
+import threading
+import uuid
+import zipfile
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from html import escape as escape_html
+from urllib.parse import quote
 
-app = Flask(__name__)
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
-class QuizConverter:
-    def parse_txt_content(self, txt_content):
-        try:
-            questions = []
-            question_blocks = txt_content.split('---')
-            
-            for block in question_blocks:
-                block = block.strip()
-                if not block:
-                    continue
-                    
-                lines = [line.strip() for line in block.split('\n') if line.strip()]
-                
-                if len(lines) >= 7:
-                    question = {
-                        'id': int(lines[0]),
-                        'text': lines[1],
-                        'options': lines[2:6],
-                        'correct_option': lines[6],
-                        'solution': lines[7] if len(lines) > 7 else 'कोई समाधान उपलब्ध नहीं'
-                    }
-                    questions.append(question)
-            
-            return questions
-        except Exception as e:
-            raise Exception(f'TXT पार्स करने में त्रुटि: {str(e)}')
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-    def generate_html(self, questions, test_name, duration, category):
-        total_marks = len(questions)
-        
-        # Safe JSON serialization for large data
-        questions_json = json.dumps(questions, ensure_ascii=False, separators=(',', ':'))
-        
-        html_template = f'''<!DOCTYPE html>
-<html lang="hi">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=no">
-    <title>{test_name}</title>
-    <link href="https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;500;600;700&display=swap" rel="stylesheet">
-    <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css" rel="stylesheet">
-    <style>
-        * {{
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+app = Flask(__name__)
+
+# Quiz page stylesheet and runtime script. They are the same for every quiz
+# and are either inlined into the page or served once as fingerprinted
+# assets (see quiz_asset and generate_html's asset_url).
+QUIZ_CSS = '''
+        * {
             box-sizing: border-box;
             margin: 0;
             padding: 0;
             -webkit-tap-highlight-color: transparent;
-        }}
+        }
         
-        html, body {{
+        html, body {
             width: 100%;
             height: 100%;
             overflow-x: hidden;
             margin: 0;
             padding: 0;
-        }}
+        }
         
-        body {{
+        body {
             font-family: 'Poppins', sans-serif;
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             min-height: 100vh;
@@ -69,17 +77,17 @@ class QuizConverter:
             line-height: 1.6;
             width: 100%;
             max-width: 100%;
-        }}
+        }
         
-        .container {{
+        .container {
             width: 100%;
             max-width: 100%;
             margin: 0 auto;
             padding: 10px 5px;
             min-height: 100vh;
-        }}
+        }
         
-        .welcome-screen {{
+        .welcome-screen {
             text-align: center;
             background: rgba(255, 255, 255, 0.95);
             backdrop-filter: blur(20px);
@@ -89,57 +97,57 @@ class QuizConverter:
             border: 1px solid rgba(255, 255, 255, 0.3);
             margin-bottom: 15px;
             width: 100%;
-        }}
+        }
         
-        .welcome-title {{
+        .welcome-title {
             font-size: 1.8rem;
             font-weight: 700;
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             -webkit-background-clip: text;
             -webkit-text-fill-color: transparent;
             margin-bottom: 8px;
-        }}
+        }
         
-        .test-name-display {{
+        .test-name-display {
             font-size: 1.4rem;
             font-weight: 600;
             color: #2d3748;
             margin-bottom: 8px;
-        }}
+        }
         
-        .category-display {{
+        .category-display {
             font-size: 1rem;
             color: #718096;
             margin-bottom: 15px;
-        }}
+        }
         
-        .quiz-stats {{
+        .quiz-stats {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(120px, 1fr));
             gap: 10px;
             margin: 20px 0;
-        }}
+        }
         
-        .stat-card {{
+        .stat-card {
             background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);
             color: white;
             padding: 15px 10px;
             border-radius: 12px;
             box-shadow: 0 5px 15px rgba(240, 147, 251, 0.3);
-        }}
+        }
         
-        .stat-value {{
+        .stat-value {
             font-size: 1.4rem;
             font-weight: 700;
             margin-bottom: 3px;
-        }}
+        }
         
-        .stat-label {{
+        .stat-label {
             font-size: 0.8rem;
             opacity: 0.9;
-        }}
+        }
         
-        .start-btn {{
+        .start-btn {
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             color: white;
             border: none;
@@ -152,19 +160,19 @@ class QuizConverter:
             box-shadow: 0 8px 20px rgba(102, 126, 234, 0.4);
             width: 90%;
             max-width: 300px;
-        }}
+        }
         
-        .start-btn:hover {{
+        .start-btn:hover {
             transform: translateY(-2px);
             box-shadow: 0 12px 25px rgba(102, 126, 234, 0.6);
-        }}
+        }
         
-        .quiz-interface {{
+        .quiz-interface {
             display: none;
             width: 100%;
-        }}
+        }
         
-        header {{
+        header {
             background: rgba(255, 255, 255, 0.95);
             backdrop-filter: blur(20px);
             border-radius: 15px;
@@ -173,9 +181,9 @@ class QuizConverter:
             box-shadow: 0 8px 20px rgba(0, 0, 0, 0.1);
             border: 1px solid rgba(255, 255, 255, 0.3);
             width: 100%;
-        }}
+        }
         
-        .timer {{
+        .timer {
             display: inline-flex;
             align-items: center;
             background: linear-gradient(135deg, #ff6b6b 0%, #ee5a52 100%);
@@ -186,26 +194,26 @@ class QuizConverter:
             font-size: 1rem;
             box-shadow: 0 4px 12px rgba(255, 107, 107, 0.3);
             margin: 10px 0;
-        }}
+        }
         
-        .progress-container {{
+        .progress-container {
             margin: 15px 0;
             background: rgba(255, 255, 255, 0.3);
             border-radius: 8px;
             height: 8px;
             overflow: hidden;
             width: 100%;
-        }}
+        }
         
-        .progress-bar {{
+        .progress-bar {
             height: 100%;
             background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
             width: 0%;
             transition: width 0.3s ease;
             border-radius: 8px;
-        }}
+        }
         
-        .question-count {{
+        .question-count {
             text-align: right;
             font-size: 0.9rem;
             color: #4a5568;
@@ -217,9 +225,9 @@ class QuizConverter:
             border-radius: 15px;
             display: inline-block;
             float: right;
-        }}
+        }
         
-        .question {{
+        .question {
             background: rgba(255, 255, 255, 0.95);
             backdrop-filter: blur(20px);
             padding: 20px 15px;
@@ -229,22 +237,22 @@ class QuizConverter:
             border: 1px solid rgba(255, 255, 255, 0.3);
             clear: both;
             width: 100%;
-        }}
+        }
         
-        .question-text {{
+        .question-text {
             font-size: 1.1rem;
             font-weight: 500;
             color: #2d3748;
             margin-bottom: 20px;
             line-height: 1.5;
-        }}
+        }
         
-        .options {{
+        .options {
             list-style: none;
             width: 100%;
-        }}
+        }
         
-        .option {{
+        .option {
             padding: 14px 15px;
             margin-bottom: 10px;
             background: rgba(247, 250, 252, 0.8);
@@ -254,30 +262,30 @@ class QuizConverter:
             transition: all 0.3s ease;
             font-weight: 500;
             width: 100%;
-        }}
+        }
         
-        .option:hover {{
+        .option:hover {
             transform: translateY(-2px);
             box-shadow: 0 6px 15px rgba(0, 0, 0, 0.1);
             border-color: #667eea;
-        }}
+        }
         
-        .option.selected {{
+        .option.selected {
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             color: white;
             border-color: #667eea;
             box-shadow: 0 8px 20px rgba(102, 126, 234, 0.3);
-        }}
+        }
         
-        .navigation {{
+        .navigation {
             display: flex;
             justify-content: space-between;
             margin-top: 20px;
             gap: 10px;
             width: 100%;
-        }}
+        }
         
-        button {{
+        button {
             padding: 12px 20px;
             border: none;
             border-radius: 20px;
@@ -286,32 +294,32 @@ class QuizConverter:
             font-weight: 600;
             transition: all 0.3s ease;
             min-width: 110px;
-        }}
+        }
         
-        button:hover:not(:disabled) {{
+        button:hover:not(:disabled) {
             transform: translateY(-2px);
             box-shadow: 0 6px 15px rgba(0, 0, 0, 0.2);
-        }}
+        }
         
-        button:disabled {{
+        button:disabled {
             background: #b0b0b0 !important;
             cursor: not-allowed;
             transform: none;
             opacity: 0.6;
-        }}
+        }
         
-        #prev-btn {{
+        #prev-btn {
             background: linear-gradient(135deg, #a0aec0 0%, #718096 100%);
             color: white;
-        }}
+        }
         
-        #next-btn {{
+        #next-btn {
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             color: white;
             box-shadow: 0 4px 12px rgba(102, 126, 234, 0.4);
-        }}
+        }
         
-        .submit-btn {{
+        .submit-btn {
             background: linear-gradient(135deg, #1cc88a 0%, #17a673 100%) !important;
             color: white;
             box-shadow: 0 4px 12px rgba(28, 200, 138, 0.4);
@@ -319,13 +327,107 @@ class QuizConverter:
             width: 90%;
             max-width: 250px;
             margin: 10px auto;
-        }}
+        }
         
-        .submit-btn.visible {{
+        .submit-btn.visible {
             display: inline-block !important;
-        }}
+        }
+        
+        .palette-panel {
+            margin-top: 20px;
+            padding: 12px;
+            background: rgba(247, 250, 252, 0.8);
+            border: 1px solid rgba(226, 232, 240, 0.8);
+            border-radius: 12px;
+        }
+        
+        .palette-header {
+            display: flex;
+            justify-content: space-between;
+            align-items: center;
+            flex-wrap: wrap;
+            gap: 8px;
+            margin-bottom: 10px;
+            font-size: 0.8rem;
+            color: #4a5568;
+        }
+        
+        .palette-legend span {
+            display: inline-block;
+            width: 10px;
+            height: 10px;
+            border-radius: 3px;
+            margin: 0 4px 0 8px;
+            vertical-align: middle;
+        }
+        
+        .jump-form {
+            display: flex;
+            gap: 6px;
+        }
+        
+        .jump-form input {
+            width: 90px;
+            padding: 6px 8px;
+            border: 1px solid #cbd5e0;
+            border-radius: 8px;
+            font-family: inherit;
+        }
+        
+        .jump-form button {
+            min-width: auto;
+            width: auto;
+            padding: 6px 14px;
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: white;
+        }
+        
+        .palette {
+            position: relative;
+            height: 176px;
+            overflow-y: auto;
+        }
+        
+        .palette-window {
+            position: absolute;
+            top: 0;
+            left: 0;
+            display: grid;
+            gap: 6px;
+        }
+        
+        .palette-cell {
+            width: 38px;
+            height: 38px;
+            line-height: 38px;
+            text-align: center;
+            border-radius: 8px;
+            font-size: 0.75rem;
+            font-weight: 600;
+            cursor: pointer;
+            background: #e2e8f0;
+            color: #4a5568;
+        }
+        
+        .palette-cell.answered,
+        .palette-legend .answered {
+            background: #1cc88a;
+            color: white;
+        }
+        
+        .palette-cell.skipped,
+        .palette-legend .skipped {
+            background: #f6ad55;
+            color: white;
+        }
+        
+        .palette-cell.current,
+        .palette-legend .current {
+            background: #667eea;
+            color: white;
+        }
         
-        .result-container {{
+        .result-container {
             text-align: center;
             padding: 30px 20px;
             background: rgba(255, 255, 255, 0.95);
@@ -336,44 +438,44 @@ class QuizConverter:
             border: 1px solid rgba(255, 255, 255, 0.3);
             display: none;
             width: 100%;
-        }}
+        }
         
-        .score {{
+        .score {
             font-size: 2.5rem;
             font-weight: 800;
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             -webkit-background-clip: text;
             -webkit-text-fill-color: transparent;
             margin: 15px 0;
-        }}
+        }
         
-        .score-breakdown {{
+        .score-breakdown {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(120px, 1fr));
             gap: 15px;
             margin: 25px 0;
-        }}
+        }
         
-        .breakdown-item {{
+        .breakdown-item {
             padding: 15px 10px;
             border-radius: 12px;
             color: white;
             font-weight: 600;
-        }}
+        }
         
-        .breakdown-item.correct {{
+        .breakdown-item.correct {
             background: linear-gradient(135deg, #48bb78 0%, #38a169 100%);
-        }}
+        }
         
-        .breakdown-item.incorrect {{
+        .breakdown-item.incorrect {
             background: linear-gradient(135deg, #f56565 0%, #e53e3e 100%);
-        }}
+        }
         
-        .breakdown-item.skipped {{
+        .breakdown-item.skipped {
             background: linear-gradient(135deg, #ed8936 0%, #dd6b20 100%);
-        }}
+        }
         
-        .restart-btn {{
+        .restart-btn {
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             color: white;
             border: none;
@@ -386,95 +488,565 @@ class QuizConverter:
             margin-top: 15px;
             width: 90%;
             max-width: 250px;
-        }}
+        }
         
-        .restart-btn:hover {{
+        .restart-btn:hover {
             transform: translateY(-2px);
             box-shadow: 0 8px 20px rgba(102, 126, 234, 0.4);
-        }}
+        }
         
         /* Mobile First Responsive */
-        @media (max-width: 480px) {{
-            .container {{
+        @media (max-width: 480px) {
+            .container {
                 padding: 8px 4px;
-            }}
+            }
             
-            .welcome-screen {{
+            .welcome-screen {
                 padding: 20px 12px;
-            }}
+            }
             
-            .welcome-title {{
+            .welcome-title {
                 font-size: 1.6rem;
-            }}
+            }
             
-            .test-name-display {{
+            .test-name-display {
                 font-size: 1.2rem;
-            }}
+            }
             
-            .question {{
+            .question {
                 padding: 15px 12px;
-            }}
+            }
             
-            .question-text {{
+            .question-text {
                 font-size: 1rem;
-            }}
+            }
             
-            .option {{
+            .option {
                 padding: 12px 10px;
                 font-size: 0.9rem;
-            }}
+            }
             
-            .navigation {{
+            .navigation {
                 flex-direction: column;
                 gap: 8px;
-            }}
+            }
             
-            button {{
+            button {
                 width: 100%;
                 min-width: auto;
-            }}
+            }
             
-            .quiz-stats {{
+            .quiz-stats {
                 grid-template-columns: 1fr;
                 gap: 8px;
-            }}
+            }
             
-            .score-breakdown {{
+            .score-breakdown {
                 grid-template-columns: 1fr;
                 gap: 10px;
-            }}
-        }}
+            }
+        }
         
         /* Ensure full width on all devices */
-        @media (min-width: 481px) {{
-            .container {{
+        @media (min-width: 481px) {
+            .container {
                 max-width: 100%;
-            }}
-        }}
-    </style>
+            }
+        }
+'''
+
+QUIZ_RUNTIME_JS = '''
+        const pendingChunks = {};
+
+        // Quiz State
+        let currentQuestionIndex = 0;
+        let userAnswers = new Array(totalQuestions).fill(null);
+        let answeredCount = 0;
+        let submitVisible = null;
+        let timer;
+        let timeLeft = quizDuration;
+        let quizStarted = false;
+
+        function startQuiz() {
+            document.getElementById('welcome-screen').style.display = 'none';
+            document.getElementById('quiz-interface').style.display = 'block';
+            document.getElementById('result-container').style.display = 'none';
+            quizStarted = true;
+            startTimer();
+            // Lay the palette out first: showQuestion scrolls it to the
+            // current (possibly resumed) question using its column count.
+            renderPalette();
+            showQuestion(currentQuestionIndex);
+            updateSubmitButton();
+        }
+
+        function startTimer() {
+            timer = setInterval(function() {
+                timeLeft--;
+                updateTimerDisplay();
+                scheduleCheckpoint();
+                if (timeLeft <= 0) {
+                    clearInterval(timer);
+                    submitQuiz();
+                }
+            }, 1000);
+        }
+
+        function updateTimerDisplay() {
+            const hours = Math.floor(timeLeft / 3600);
+            const minutes = Math.floor((timeLeft % 3600) / 60);
+            const seconds = timeLeft % 60;
+            document.getElementById('time-display').textContent = 
+                `${hours.toString().padStart(2, '0')}:${minutes.toString().padStart(2, '0')}:${seconds.toString().padStart(2, '0')}`;
+        }
+
+        function loadChunk(chunk) {
+            if (!pendingChunks[chunk]) {
+                pendingChunks[chunk] = fetch(chunkUrl.replace('{chunk}', chunk))
+                    .then(response => response.json())
+                    .then(columns => {
+                        const start = chunk * chunkSize;
+                        columns.texts.forEach((text, i) => { quizData.texts[start + i] = text; });
+                        columns.options.forEach((option, i) => { quizData.options[start * 4 + i] = option; });
+                        columns.solutions.forEach((solution, i) => { quizData.solutions[start + i] = solution; });
+                    })
+                    .catch(() => {
+                        delete pendingChunks[chunk];
+                    });
+            }
+            return pendingChunks[chunk];
+        }
+
+        function getQuestion(index) {
+            if (quizData.texts[index] === undefined) return null;
+            return {
+                text: quizData.texts[index],
+                options: quizData.options.slice(index * 4, index * 4 + 4),
+                solution: quizData.solutions[index]
+            };
+        }
+
+        // The question block is built once; showing a question only swaps
+        // text and toggles the selected class on the existing nodes.
+        const questionTextEl = document.getElementById('question-text');
+        const optionEls = Array.from(document.querySelectorAll('#quiz-content .option'));
+
+        function showQuestion(index) {
+            if (index < 0 || index >= totalQuestions) return;
+            
+            const question = getQuestion(index);
+            const progress = ((index + 1) / totalQuestions) * 100;
+            
+            document.getElementById('progress-bar').style.width = `${progress}%`;
+            document.getElementById('question-count').textContent = `Question ${index + 1}/${totalQuestions}`;
+            document.getElementById('prev-btn').disabled = index === 0;
+            document.getElementById('next-btn').disabled = index === totalQuestions - 1;
+            markCurrent(index);
+            scheduleCheckpoint();
+
+            if (!question) {
+                questionTextEl.textContent = 'Loading...';
+                optionEls.forEach(optionEl => {
+                    optionEl.textContent = '';
+                    optionEl.classList.remove('selected');
+                });
+                loadChunk(Math.floor(index / chunkSize)).then(() => {
+                    if (currentQuestionIndex === index && getQuestion(index)) showQuestion(index);
+                });
+                return;
+            }
+
+            // Prefetch the next chunk a few questions before it is needed.
+            const nextChunk = Math.floor(index / chunkSize) + 1;
+            if (chunkUrl && index % chunkSize >= chunkSize - 5 && nextChunk * chunkSize < totalQuestions) {
+                loadChunk(nextChunk);
+            }
+
+            questionTextEl.innerHTML = question.text;
+            optionEls.forEach((optionEl, i) => {
+                optionEl.innerHTML = question.options[i];
+                optionEl.classList.toggle('selected', userAnswers[index] === i + 1);
+            });
+            
+            updateSubmitButton();
+        }
+
+        function selectOption(optionNumber) {
+            timed('select', () => {
+                const index = currentQuestionIndex;
+                const previous = userAnswers[index];
+                if (previous === optionNumber || !getQuestion(index)) return;
+
+                if (previous === null) {
+                    answeredCount++;
+                } else {
+                    optionEls[previous - 1].classList.remove('selected');
+                }
+                userAnswers[index] = optionNumber;
+                optionEls[optionNumber - 1].classList.add('selected');
+                updateSubmitButton();
+                refreshPaletteCell(index);
+                scheduleCheckpoint();
+            });
+        }
+
+        // Question palette: only the rows inside the scroll viewport (plus a
+        // few rows of overscan) have cells; the spacer keeps the full height
+        // so the scrollbar still spans every question.
+        const PALETTE_CELL = 44;
+        const PALETTE_OVERSCAN = 2;
+        const paletteEl = document.getElementById('palette');
+        const paletteSpacer = document.getElementById('palette-spacer');
+        const paletteWindow = document.getElementById('palette-window');
+        const paletteCells = [];
+        let visited = new Uint8Array(totalQuestions);
+        let paletteCurrent = 0;
+        let paletteColumns = 1;
+        let paletteFirst = 0;
+        let paletteCount = 0;
+        let paletteFrame = null;
+
+        function paletteState(index) {
+            if (index === paletteCurrent) return 'current';
+            if (userAnswers[index] !== null) return 'answered';
+            return visited[index] ? 'skipped' : '';
+        }
+
+        function paintPaletteCell(cell, index) {
+            cell.textContent = index + 1;
+            cell.dataset.index = index;
+            cell.className = `palette-cell ${paletteState(index)}`;
+        }
+
+        function renderPalette() {
+            paletteFrame = null;
+            if (!paletteEl.clientWidth) return;
+
+            paletteColumns = Math.max(1, Math.floor((paletteEl.clientWidth + 6) / PALETTE_CELL));
+            paletteSpacer.style.height = `${Math.ceil(totalQuestions / paletteColumns) * PALETTE_CELL}px`;
+            paletteWindow.style.gridTemplateColumns = `repeat(${paletteColumns}, 38px)`;
+
+            const firstRow = Math.max(0, Math.floor(paletteEl.scrollTop / PALETTE_CELL) - PALETTE_OVERSCAN);
+            const rows = Math.ceil(paletteEl.clientHeight / PALETTE_CELL) + PALETTE_OVERSCAN * 2;
+            paletteFirst = firstRow * paletteColumns;
+            paletteCount = Math.min(totalQuestions - paletteFirst, rows * paletteColumns);
+            paletteWindow.style.transform = `translateY(${firstRow * PALETTE_CELL}px)`;
+
+            // Cells are pooled: scrolling repaints the same nodes.
+            while (paletteCells.length < paletteCount) {
+                paletteCells.push(paletteWindow.appendChild(document.createElement('div')));
+            }
+            paletteCells.forEach((cell, i) => {
+                cell.hidden = i >= paletteCount;
+                if (!cell.hidden) paintPaletteCell(cell, paletteFirst + i);
+            });
+        }
+
+        function schedulePalette() {
+            if (paletteFrame === null) paletteFrame = requestAnimationFrame(renderPalette);
+        }
+
+        function refreshPaletteCell(index) {
+            const offset = index - paletteFirst;
+            if (offset >= 0 && offset < paletteCount) paintPaletteCell(paletteCells[offset], index);
+        }
+
+        function markCurrent(index) {
+            const previous = paletteCurrent;
+            visited[previous] = 1;
+            paletteCurrent = index;
+            refreshPaletteCell(previous);
+            refreshPaletteCell(index);
+
+            // Keep the current cell inside the palette viewport.
+            const top = Math.floor(index / paletteColumns) * PALETTE_CELL;
+            if (top < paletteEl.scrollTop || top + PALETTE_CELL > paletteEl.scrollTop + paletteEl.clientHeight) {
+                paletteEl.scrollTop = Math.max(0, top - (paletteEl.clientHeight - PALETTE_CELL) / 2);
+                schedulePalette();
+            }
+        }
+
+        function jumpToQuestion(index) {
+            if (!Number.isInteger(index) || index < 0 || index >= totalQuestions || index === currentQuestionIndex) return;
+            currentQuestionIndex = index;
+            timed('navigate', () => showQuestion(index));
+        }
+
+        function jumpToInput() {
+            const input = document.getElementById('jump-input');
+            jumpToQuestion(parseInt(input.value, 10) - 1);
+            input.value = '';
+        }
+
+        function paletteClick(event) {
+            const index = event.target.dataset.index;
+            if (index !== undefined) jumpToQuestion(Number(index));
+        }
+
+        paletteEl.addEventListener('scroll', schedulePalette);
+        window.addEventListener('resize', schedulePalette);
+
+        function nextQuestion() {
+            if (currentQuestionIndex < totalQuestions - 1) {
+                currentQuestionIndex++;
+                timed('navigate', () => showQuestion(currentQuestionIndex));
+            }
+        }
+
+        function prevQuestion() {
+            if (currentQuestionIndex > 0) {
+                currentQuestionIndex--;
+                timed('navigate', () => showQuestion(currentQuestionIndex));
+            }
+        }
+
+        function updateSubmitButton() {
+            const shouldShowSubmit = answeredCount >= Math.min(5, totalQuestions) || currentQuestionIndex === totalQuestions - 1;
+            if (shouldShowSubmit === submitVisible) return;
+            submitVisible = shouldShowSubmit;
+            
+            if (shouldShowSubmit) {
+                document.getElementById('top-submit-btn').classList.add('visible');
+                document.getElementById('bottom-submit-btn').classList.add('visible');
+            } else {
+                document.getElementById('top-submit-btn').classList.remove('visible');
+                document.getElementById('bottom-submit-btn').classList.remove('visible');
+            }
+        }
+
+        // Opt-in timing overlay: open the quiz with #timing (or ?timing) to
+        // see script time and time to next frame for clicks and navigation.
+        const timingEnabled = /[?#&]timing\\b/.test(location.search + location.hash);
+        const timings = {};
+        let timingOverlay = null;
+
+        function timed(label, action) {
+            if (!timingEnabled) return action();
+            const start = performance.now();
+            action();
+            const scripted = performance.now() - start;
+            requestAnimationFrame(() => recordTiming(label, scripted, performance.now() - start));
+        }
+
+        function recordTiming(label, scripted, frame) {
+            const stats = timings[label] || (timings[label] = { count: 0, total: 0 });
+            stats.count++;
+            stats.total += frame;
+            if (!timingOverlay) {
+                timingOverlay = document.createElement('div');
+                timingOverlay.style.cssText = 'position: fixed; bottom: 8px; left: 8px; z-index: 1000; background: rgba(0, 0, 0, 0.75); color: #fff; font: 12px monospace; padding: 6px 8px; border-radius: 6px; white-space: pre;';
+                document.body.appendChild(timingOverlay);
+            }
+            timingOverlay.textContent = Object.keys(timings).map(name => {
+                const t = timings[name];
+                return `${name}: avg ${(t.total / t.count).toFixed(1)} ms (${t.count})`;
+            }).join('\\n') + `\\nlast ${label}: js ${scripted.toFixed(1)} ms, frame ${frame.toFixed(1)} ms`;
+        }
+
+        function submitQuiz() {
+            if (!confirm('क्या आप वाकई टेस्ट submit करना चाहते हैं?')) return;
+            
+            clearInterval(timer);
+            quizStarted = false;
+            clearCheckpoint();
+            
+            let correctCount = 0;
+            let incorrectCount = 0;
+            let skippedCount = 0;
+
+            answerKey.forEach((correctOption, index) => {
+                if (userAnswers[index] === null) {
+                    skippedCount++;
+                } else if (userAnswers[index] === correctOption) {
+                    correctCount++;
+                } else {
+                    incorrectCount++;
+                }
+            });
+
+            document.getElementById('score').textContent = `${correctCount}/${totalQuestions}`;
+            document.getElementById('correct-count').textContent = correctCount;
+            document.getElementById('incorrect-count').textContent = incorrectCount;
+            document.getElementById('skipped-count').textContent = skippedCount;
+
+            // Performance message
+            const percentage = (correctCount / totalQuestions) * 100;
+            let message = '';
+            if (percentage >= 80) {
+                message = 'Excellent performance! 🎉';
+            } else if (percentage >= 60) {
+                message = 'Good job! 👍';
+            } else if (percentage >= 40) {
+                message = 'Average performance. Keep practicing! 💪';
+            } else {
+                message = 'Need more practice. Don\\'t give up! 📚';
+            }
+            document.getElementById('result-message').textContent = message;
+
+            document.getElementById('quiz-interface').style.display = 'none';
+            document.getElementById('result-container').style.display = 'block';
+
+            if (submitUrl) sendSubmission();
+        }
+
+        function sendSubmission() {
+            const status = document.getElementById('submit-status');
+            status.textContent = 'Saving result...';
+            fetch(submitUrl, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({
+                    answers: userAnswers,
+                    candidate: new URLSearchParams(location.search).get('candidate'),
+                    timeTaken: quizDuration - timeLeft
+                })
+            })
+                .then(response => response.json())
+                .then(data => {
+                    if (!data.success) throw new Error(data.error);
+                    status.textContent = `Result saved (ID: ${data.result.submissionId})`;
+                })
+                .catch(() => {
+                    status.textContent = 'Result could not be saved on the server.';
+                });
+        }
+
+        function restartQuiz() {
+            currentQuestionIndex = 0;
+            userAnswers = new Array(totalQuestions).fill(null);
+            answeredCount = 0;
+            visited = new Uint8Array(totalQuestions);
+            paletteCurrent = 0;
+            paletteEl.scrollTop = 0;
+            timeLeft = quizDuration;
+            clearCheckpoint();
+            
+            document.getElementById('result-container').style.display = 'none';
+            document.getElementById('welcome-screen').style.display = 'block';
+            document.getElementById('progress-bar').style.width = '0%';
+            document.getElementById('start-btn').innerHTML = '<i class="fas fa-play"></i> Start Quiz';
+            updateSubmitButton();
+        }
+
+        // Progress checkpoint in localStorage so a reload resumes the attempt
+        // (answers, remaining time, current question). Writes are throttled
+        // to one per CHECKPOINT_INTERVAL ms, plus one when the page is hidden.
+        const CHECKPOINT_INTERVAL = 3000;
+        const checkpointKey = (() => {
+            const source = `${document.title}|${totalQuestions}|${answerKey.join('')}`;
+            let hash = 0;
+            for (let i = 0; i < source.length; i++) hash = (hash * 31 + source.charCodeAt(i)) | 0;
+            return `quiz-checkpoint:${location.pathname}:${hash >>> 0}`;
+        })();
+        let checkpointTimer = null;
+
+        function saveCheckpoint() {
+            clearTimeout(checkpointTimer);
+            checkpointTimer = null;
+            if (!quizStarted) return;
+            try {
+                localStorage.setItem(checkpointKey, JSON.stringify({
+                    answers: userAnswers.map(answer => answer || 0).join(''),
+                    timeLeft: timeLeft,
+                    index: currentQuestionIndex
+                }));
+            } catch (e) {
+                // Storage full or disabled: the quiz works without it.
+            }
+        }
+
+        function scheduleCheckpoint() {
+            if (checkpointTimer === null) checkpointTimer = setTimeout(saveCheckpoint, CHECKPOINT_INTERVAL);
+        }
+
+        function clearCheckpoint() {
+            clearTimeout(checkpointTimer);
+            checkpointTimer = null;
+            try {
+                localStorage.removeItem(checkpointKey);
+            } catch (e) {}
+        }
+
+        function restoreCheckpoint() {
+            let saved = null;
+            try {
+                saved = JSON.parse(localStorage.getItem(checkpointKey));
+            } catch (e) {}
+            if (!saved || typeof saved.answers !== 'string' || saved.answers.length !== totalQuestions) return;
+
+            for (let i = 0; i < totalQuestions; i++) {
+                const answer = saved.answers.charCodeAt(i) - 48;
+                if (answer >= 1 && answer <= 4) {
+                    userAnswers[i] = answer;
+                    answeredCount++;
+                }
+            }
+            timeLeft = Math.max(0, Math.min(saved.timeLeft, quizDuration));
+            currentQuestionIndex = Math.min(Math.max(saved.index | 0, 0), totalQuestions - 1);
+            document.getElementById('start-btn').innerHTML = '<i class="fas fa-play"></i> Resume Quiz';
+        }
+
+        document.addEventListener('visibilitychange', () => {
+            if (document.visibilityState === 'hidden') saveCheckpoint();
+        });
+        window.addEventListener('pagehide', saveCheckpoint);
+
+        function registerServiceWorker() {
+            if (!swUrl || !('serviceWorker' in navigator) || !location.protocol.startsWith('http')) return;
+            navigator.serviceWorker.register(swUrl)
+                .then(() => navigator.serviceWorker.ready)
+                .then(registration => {
+                    // Cache the page, its assets and every lazy chunk now, so
+                    // a quiz opened online can be finished offline.
+                    const assets = Array.from(document.querySelectorAll('link[rel="stylesheet"], script[src]'), el => el.href || el.src);
+                    const urls = [location.href.split('#')[0]].concat(assets);
+                    for (let chunk = 1; chunkUrl && chunk * chunkSize < totalQuestions; chunk++) {
+                        urls.push(new URL(chunkUrl.replace('{chunk}', chunk), location.href).href);
+                    }
+                    registration.active.postMessage({ cache: urls });
+                })
+                .catch(() => {});
+        }
+
+        // Initialize
+        restoreCheckpoint();
+        updateTimerDisplay();
+        registerServiceWorker();
+'''
+
+# Static quiz page shell. {{name}} marks an insertion slot; the template is
+# split into fixed chunks once at import time so rendering is a single join.
+QUIZ_TEMPLATE = '''<!DOCTYPE html>
+<html lang="hi">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=no">
+    <title>{{test_name}}</title>
+    {{head_links}}
+    {{styles}}
 </head>
 <body>
     <div class="container">
         <!-- Welcome Screen -->
         <div class="welcome-screen" id="welcome-screen">
             <h1 class="welcome-title">Welcome to Quiz</h1>
-            <h2 class="test-name-display">{test_name}</h2>
-            <p class="category-display">{category}</p>
+            <h2 class="test-name-display">{{test_name}}</h2>
+            <p class="category-display">{{category}}</p>
             <div class="quiz-stats">
                 <div class="stat-card">
-                    <div class="stat-value">{len(questions)}</div>
+                    <div class="stat-value">{{total_questions}}</div>
                     <div class="stat-label">Total Questions</div>
                 </div>
                 <div class="stat-card">
-                    <div class="stat-value">{total_marks}</div>
+                    <div class="stat-value">{{total_marks}}</div>
                     <div class="stat-label">Total Marks</div>
                 </div>
                 <div class="stat-card">
-                    <div class="stat-value">{duration}</div>
+                    <div class="stat-value">{{duration}}</div>
                     <div class="stat-label">Minutes</div>
                 </div>
             </div>
-            <button class="start-btn" onclick="startQuiz()">
+            <button class="start-btn" id="start-btn" onclick="startQuiz()">
                 <i class="fas fa-play"></i> Start Quiz
             </button>
         </div>
@@ -482,17 +1054,17 @@ class QuizConverter:
         <!-- Quiz Interface -->
         <div class="quiz-interface" id="quiz-interface">
             <header>
-                <h1>{test_name}</h1>
-                <p style="text-align: center; color: #718096; margin-top: 5px; font-size: 0.9rem;">{category}</p>
+                <h1>{{test_name}}</h1>
+                <p style="text-align: center; color: #718096; margin-top: 5px; font-size: 0.9rem;">{{category}}</p>
                 <div style="display: flex; justify-content: space-around; margin-top: 12px; flex-wrap: wrap; gap: 8px;">
                     <div style="background: rgba(102, 126, 234, 0.1); color: #667eea; padding: 8px 12px; border-radius: 15px; font-size: 0.8rem; font-weight: 600;">
-                        Questions: {len(questions)}
+                        Questions: {{total_questions}}
                     </div>
                     <div style="background: rgba(102, 126, 234, 0.1); color: #667eea; padding: 8px 12px; border-radius: 15px; font-size: 0.8rem; font-weight: 600;">
-                        Marks: {total_marks}
+                        Marks: {{total_marks}}
                     </div>
                     <div style="background: rgba(102, 126, 234, 0.1); color: #667eea; padding: 8px 12px; border-radius: 15px; font-size: 0.8rem; font-weight: 600;">
-                        Time: {duration} Min
+                        Time: {{duration}} Min
                     </div>
                 </div>
             </header>
@@ -514,9 +1086,19 @@ class QuizConverter:
                 <div class="progress-bar" id="progress-bar"></div>
             </div>
 
-            <div class="question-count" id="question-count">Question 1/{len(questions)}</div>
+            <div class="question-count" id="question-count">Question 1/{{total_questions}}</div>
 
-            <div id="quiz-content"></div>
+            <div id="quiz-content">
+                <div class="question">
+                    <div class="question-text" id="question-text"></div>
+                    <ul class="options">
+                        <li class="option" onclick="selectOption(1)"></li>
+                        <li class="option" onclick="selectOption(2)"></li>
+                        <li class="option" onclick="selectOption(3)"></li>
+                        <li class="option" onclick="selectOption(4)"></li>
+                    </ul>
+                </div>
+            </div>
 
             <div class="navigation">
                 <button disabled id="prev-btn" onclick="prevQuestion()">
@@ -527,6 +1109,24 @@ class QuizConverter:
                 </button>
             </div>
 
+            <div class="palette-panel">
+                <div class="palette-header">
+                    <div class="palette-legend">
+                        <span class="answered"></span>Answered
+                        <span class="skipped"></span>Skipped
+                        <span class="current"></span>Current
+                    </div>
+                    <form class="jump-form" onsubmit="event.preventDefault(); jumpToInput();">
+                        <input type="number" id="jump-input" min="1" max="{{total_questions}}" placeholder="Go to #">
+                        <button type="submit">Go</button>
+                    </form>
+                </div>
+                <div class="palette" id="palette" onclick="paletteClick(event)">
+                    <div id="palette-spacer"></div>
+                    <div class="palette-window" id="palette-window"></div>
+                </div>
+            </div>
+
             <div style="text-align: center; margin-top: 15px;">
                 <button class="submit-btn" id="bottom-submit-btn" onclick="submitQuiz()">
                     <i class="fas fa-check"></i> Submit Quiz
@@ -537,8 +1137,9 @@ class QuizConverter:
         <!-- Results Screen -->
         <div class="result-container" id="result-container">
             <h2>Your Results</h2>
-            <div class="score" id="score">0/{total_marks}</div>
+            <div class="score" id="score">0/{{total_marks}}</div>
             <p class="performance-message" id="result-message" style="margin: 15px 0; font-size: 1rem;"></p>
+            <p id="submit-status" style="color: #718096; font-size: 0.8rem;"></p>
             <div class="score-breakdown" id="score-breakdown">
                 <div class="breakdown-item correct">
                     <div class="breakdown-number" id="correct-count">0</div>
@@ -560,168 +1161,2163 @@ class QuizConverter:
     </div>
 
     <script>
-        // Quiz Data
-        const questions = {questions_json};
-        const totalQuestions = questions.length;
+        // Quiz Data: columnar {texts, options (4 per question), solutions};
+        // answerKey holds the correct option number (1-4) of every question.
+        const quizData = {{questions_json}};
+        const answerKey = {{answers_json}};
+        const totalQuestions = {{total_questions}};
+        const quizDuration = {{time_left}};
 
-        // Quiz State
-        let currentQuestionIndex = 0;
-        let userAnswers = new Array(totalQuestions).fill(null);
-        let timer;
-        let timeLeft = {int(duration) * 60};
-        let quizStarted = false;
+        // Lazy loading: with chunkUrl set only the first chunk is embedded
+        // and the rest is fetched on demand.
+        const chunkUrl = {{chunk_url}};
+        const chunkSize = {{chunk_size}};
 
-        function startQuiz() {{
-            document.getElementById('welcome-screen').style.display = 'none';
-            document.getElementById('quiz-interface').style.display = 'block';
-            document.getElementById('result-container').style.display = 'none';
-            quizStarted = true;
-            startTimer();
-            showQuestion(currentQuestionIndex);
-            updateSubmitButton();
-        }}
+        // With submitUrl set the answers are also posted to the server,
+        // which scores and stores them.
+        const submitUrl = {{submit_url}};
 
-        function startTimer() {{
-            timer = setInterval(function() {{
-                timeLeft--;
-                updateTimerDisplay();
-                if (timeLeft <= 0) {{
-                    clearInterval(timer);
-                    submitQuiz();
-                }}
-            }}, 1000);
-        }}
+        // Offline mode: service worker that keeps this page and its assets
+        // and chunks cached.
+        const swUrl = {{sw_url}};
+    </script>
+    {{runtime}}
+</body>
+</html>'''
 
-        function updateTimerDisplay() {{
-            const hours = Math.floor(timeLeft / 3600);
-            const minutes = Math.floor((timeLeft % 3600) / 60);
-            const seconds = timeLeft % 60;
-            document.getElementById('time-display').textContent = 
-                `${{hours.toString().padStart(2, '0')}}:${{minutes.toString().padStart(2, '0')}}:${{seconds.toString().padStart(2, '0')}}`;
-        }}
+QUIZ_TEMPLATE_PARTS = re.split(r'\{\{(\w+)\}\}', QUIZ_TEMPLATE)
 
-        function showQuestion(index) {{
-            if (index < 0 || index >= totalQuestions) return;
-            
-            const question = questions[index];
-            const progress = ((index + 1) / totalQuestions) * 100;
-            
-            document.getElementById('progress-bar').style.width = `${{progress}}%`;
-            document.getElementById('question-count').textContent = `Question ${{index + 1}}/${{totalQuestions}}`;
+QUIZ_ASSET_FINGERPRINT = hashlib.sha256((QUIZ_CSS + QUIZ_RUNTIME_JS).encode('utf-8')).hexdigest()[:12]
+QUIZ_CSS_NAME = f'quiz.{QUIZ_ASSET_FINGERPRINT}.css'
+QUIZ_JS_NAME = f'quiz.{QUIZ_ASSET_FINGERPRINT}.js'
+QUIZ_ASSETS = {
+    QUIZ_CSS_NAME: ('text/css', QUIZ_CSS),
+    QUIZ_JS_NAME: ('application/javascript', QUIZ_RUNTIME_JS),
+}
 
-            let optionsHtml = '';
-            question.options.forEach((option, i) => {{
-                const optionNumber = (i + 1).toString();
-                const isSelected = userAnswers[index] === optionNumber;
-                optionsHtml += `<li class="option ${{isSelected ? 'selected' : ''}}" onclick="selectOption('${{optionNumber}}')">${{option}}</li>`;
-            }});
+# Web font and icon stylesheets of a normal page. Offline pages replace them
+# with QUIZ_OFFLINE_HEAD: the system font stack and the six icons the page
+# uses as inline SVG masks, so nothing has to be fetched from another host.
+QUIZ_REMOTE_HEAD = '''<link href="https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;500;600;700&display=swap" rel="stylesheet">
+    <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css" rel="stylesheet">'''
 
-            document.getElementById('quiz-content').innerHTML = `
-                <div class="question">
-                    <div class="question-text">${{question.text}}</div>
-                    <ul class="options">${{optionsHtml}}</ul>
-                </div>
-            `;
+QUIZ_OFFLINE_ICONS = {
+    'play': '<path d="M4 2l10 6-10 6z"/>',
+    'clock': '<circle cx="8" cy="8" r="6.3" fill="none" stroke="#000" stroke-width="1.6"/>'
+             '<path d="M8 4.2V8l2.8 1.8" fill="none" stroke="#000" stroke-width="1.6"/>',
+    'check': '<path d="M2 8.5l4 4 8-9" fill="none" stroke="#000" stroke-width="2.2"/>',
+    'chevron-left': '<path d="M10.5 2.5L5 8l5.5 5.5" fill="none" stroke="#000" stroke-width="2.2"/>',
+    'chevron-right': '<path d="M5.5 2.5L11 8l-5.5 5.5" fill="none" stroke="#000" stroke-width="2.2"/>',
+    'redo': '<path d="M13 8a5 5 0 1 1-1.6-3.7" fill="none" stroke="#000" stroke-width="1.8"/>'
+            '<path d="M14 1.5V6H9.5z"/>',
+}
 
-            document.getElementById('prev-btn').disabled = index === 0;
-            document.getElementById('next-btn').disabled = index === totalQuestions - 1;
-            
-            updateSubmitButton();
-        }}
+QUIZ_OFFLINE_HEAD = '''<style>
+        html body { font-family: system-ui, -apple-system, "Segoe UI", Roboto, "Noto Sans", "Noto Sans Devanagari", sans-serif; }
+        .fas::before { content: ""; display: inline-block; width: 1em; height: 1em; vertical-align: -0.125em; background-color: currentColor; -webkit-mask: var(--icon) center / contain no-repeat; mask: var(--icon) center / contain no-repeat; }
+''' + ''.join(
+    '        .fa-%s { --icon: url("data:image/svg+xml,%s"); }\n' % (
+        name, quote('<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 16 16">%s</svg>' % svg)
+    )
+    for name, svg in QUIZ_OFFLINE_ICONS.items()
+) + '    </style>'
 
-        function selectOption(optionNumber) {{
-            userAnswers[currentQuestionIndex] = optionNumber;
-            showQuestion(currentQuestionIndex);
-        }}
+# Service worker of offline pages, served at /quizzes/sw.js and written as
+# quiz-sw.js next to exported pages. Same-origin GETs are answered from the
+# cache and refreshed in the background; a new runtime gets a new cache and
+# the old ones are dropped.
+QUIZ_SW_NAME = 'quiz-sw.js'
+QUIZ_SW_JS = '''const CACHE = 'quiz-%s';
 
-        function nextQuestion() {{
-            if (currentQuestionIndex < totalQuestions - 1) {{
-                currentQuestionIndex++;
-                showQuestion(currentQuestionIndex);
-            }}
-        }}
+self.addEventListener('install', () => self.skipWaiting());
 
-        function prevQuestion() {{
-            if (currentQuestionIndex > 0) {{
-                currentQuestionIndex--;
-                showQuestion(currentQuestionIndex);
-            }}
-        }}
+self.addEventListener('activate', event => {
+    event.waitUntil(caches.keys()
+        .then(keys => Promise.all(keys.filter(key => key.startsWith('quiz-') && key !== CACHE).map(key => caches.delete(key))))
+        .then(() => self.clients.claim()));
+});
 
-        function updateSubmitButton() {{
-            const answeredCount = userAnswers.filter(answer => answer !== null).length;
-            const shouldShowSubmit = answeredCount >= Math.min(5, totalQuestions) || currentQuestionIndex === totalQuestions - 1;
-            
-            if (shouldShowSubmit) {{
-                document.getElementById('top-submit-btn').classList.add('visible');
-                document.getElementById('bottom-submit-btn').classList.add('visible');
-            }} else {{
-                document.getElementById('top-submit-btn').classList.remove('visible');
-                document.getElementById('bottom-submit-btn').classList.remove('visible');
-            }}
-        }}
+// A page, its lazy chunks and its stylesheet and script; never API
+// responses such as /analytics or the submissions listing.
+const CACHEABLE = /(\/|\.html|\/chunks\/\d+\.json|\.css|\.js)$/;
 
-        function submitQuiz() {{
-            if (!confirm('क्या आप वाकई टेस्ट submit करना चाहते हैं?')) return;
-            
-            clearInterval(timer);
-            
-            let correctCount = 0;
-            let incorrectCount = 0;
-            let skippedCount = 0;
+self.addEventListener('message', event => {
+    const urls = ((event.data && event.data.cache) || []).filter(url => {
+        const parsed = new URL(url, self.location.href);
+        return parsed.origin === self.location.origin && CACHEABLE.test(parsed.pathname);
+    });
+    event.waitUntil(caches.open(CACHE).then(cache => Promise.all(urls.map(url => cache.add(url).catch(() => {})))));
+});
 
-            questions.forEach((question, index) => {{
-                if (userAnswers[index] === null) {{
-                    skippedCount++;
-                }} else if (userAnswers[index] === question.correct_option) {{
-                    correctCount++;
-                }} else {{
-                    incorrectCount++;
-                }}
-            }});
+self.addEventListener('fetch', event => {
+    // Only what a page asked to keep is served from (and refreshed in) the
+    // cache; every other request goes to the network untouched.
+    const request = event.request;
+    if (request.method !== 'GET' || new URL(request.url).origin !== self.location.origin) return;
+    event.respondWith(caches.open(CACHE).then(cache => cache.match(request).then(cached => {
+        if (!cached) return fetch(request);
+        const network = fetch(request).then(response => {
+            if (response.ok) cache.put(request, response.clone());
+            return response;
+        });
+        event.waitUntil(network.catch(() => {}));
+        return cached;
+    })));
+});
+''' % QUIZ_ASSET_FINGERPRINT
 
-            document.getElementById('score').textContent = `${{correctCount}}/${{totalQuestions}}`;
-            document.getElementById('correct-count').textContent = correctCount;
-            document.getElementById('incorrect-count').textContent = incorrectCount;
-            document.getElementById('skipped-count').textContent = skippedCount;
+# Questions embedded in a lazily loaded page, and per fetched chunk.
+LAZY_CHUNK_SIZE = 50
 
-            // Performance message
-            const percentage = (correctCount / totalQuestions) * 100;
-            let message = '';
-            if (percentage >= 80) {{
-                message = 'Excellent performance! 🎉';
-            }} else if (percentage >= 60) {{
-                message = 'Good job! 👍';
-            }} else if (percentage >= 40) {{
-                message = 'Average performance. Keep practicing! 💪';
-            }} else {{
-                message = 'Need more practice. Don\\\\'t give up! 📚';
-            }}
-            document.getElementById('result-message').textContent = message;
+# Shared assets and exported sites are compressed once, so favour ratio.
+GZIP_LEVEL = 9
+BROTLI_QUALITY = int(os.environ.get('QUIZ_BROTLI_QUALITY', 9))
+# Quiz responses are compressed while the client waits (streamed, or on the
+# first request for each encoding), so favour speed.
+LIVE_GZIP_LEVEL = 4
+LIVE_BROTLI_QUALITY = int(os.environ.get('QUIZ_LIVE_BROTLI_QUALITY', 4))
 
-            document.getElementById('quiz-interface').style.display = 'none';
-            document.getElementById('result-container').style.display = 'block';
-        }}
+NO_SOLUTION = 'कोई समाधान उपलब्ध नहीं'
 
-        function restartQuiz() {{
-            currentQuestionIndex = 0;
-            userAnswers = new Array(totalQuestions).fill(null);
-            timeLeft = {int(duration) * 60};
-            
-            document.getElementById('result-container').style.display = 'none';
-            document.getElementById('welcome-screen').style.display = 'block';
-            document.getElementById('progress-bar').style.width = '0%';
-            updateSubmitButton();
-        }}
+def dumps_json(value):
+    # Compact JSON with non-ASCII kept as is; orjson when installed, which
+    # gives the same text as the stdlib for the lists, dicts, strings and
+    # ints serialized here.
+    if orjson is not None:
+        return orjson.dumps(value).decode('utf-8')
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
 
-        // Initialize
-        updateTimerDisplay();
-    </script>
-</body>
-</html>'''
-        return html_template
+def escape_script_json(text):
+    # JSON text made safe inside an inline <script>: '<' (which could close
+    # the script or open a comment) and U+2028/U+2029 (line terminators to
+    # older JS engines) become \u escapes, which decode to the same
+    # string. Chained str.replace is much faster here than one str.translate.
+    return text.replace('<', '\\u003c').replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+
+def script_json(value):
+    return escape_script_json(dumps_json(value))
+
+class QuestionTable:
+    # Compact columnar storage for parsed questions: parallel arrays instead
+    # of one dict per question. Option strings are interned (banks repeat
+    # the same options a lot) and stored flat, four per question; correct
+    # options are small ints, 0 when the source answer is not one of 1-4.
+    # Indexing returns the usual question dict.
+    __slots__ = ('ids', 'texts', 'options', 'answers', 'solutions')
+
+    def __init__(self):
+        self.ids = array('q')
+        self.texts = []
+        self.options = []
+        self.answers = array('b')
+        self.solutions = []
+
+    @classmethod
+    def from_questions(cls, questions):
+        if isinstance(questions, cls):
+            return questions
+        table = cls()
+        for question in questions:
+            table.append(question)
+        return table
+
+    def append(self, question):
+        self.ids.append(question['id'])
+        self.texts.append(question['text'])
+        self.options.extend(sys.intern(option) for option in question['options'])
+        correct = str(question['correct_option'])
+        self.answers.append(int(correct) if correct in ('1', '2', '3', '4') else 0)
+        solution = question['solution']
+        self.solutions.append(NO_SOLUTION if solution == NO_SOLUTION else solution)
+
+    def extend(self, other):
+        # Appends another table, e.g. one parsed in a worker process (its
+        # strings come back unpickled, so they are interned again here).
+        self.ids.extend(other.ids)
+        self.texts.extend(other.texts)
+        self.options.extend(map(sys.intern, other.options))
+        self.answers.extend(other.answers)
+        self.solutions.extend([NO_SOLUTION if solution == NO_SOLUTION else solution for solution in other.solutions])
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, _ = index.indices(len(self))
+            table = QuestionTable()
+            table.ids = self.ids[start:stop]
+            table.texts = self.texts[start:stop]
+            table.options = self.options[start * 4:stop * 4]
+            table.answers = self.answers[start:stop]
+            table.solutions = self.solutions[start:stop]
+            return table
+        if index < 0:
+            index += len(self)
+        return {
+            'id': self.ids[index],
+            'text': self.texts[index],
+            'options': self.options[index * 4:index * 4 + 4],
+            'correct_option': str(self.answers[index]),
+            'solution': self.solutions[index]
+        }
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def columns(self, start=0, stop=None):
+        # Layout embedded in the page and served as lazy chunks. Answers are
+        # sent separately as the page-wide answer key.
+        stop = len(self) if stop is None else min(stop, len(self))
+        return {
+            'texts': self.texts[start:stop],
+            'options': self.options[start * 4:stop * 4],
+            'solutions': self.solutions[start:stop]
+        }
+
+class QuizConverter:
+    def iter_questions(self, stream):
+        # Reads any file-like object (text or bytes) line by line and yields
+        # one question dict per '---' block, so memory stays flat.
+        for lines, _ in self._iter_blocks(stream):
+            question = self._build_question(lines)
+            if question is not None:
+                yield question
+
+    def _iter_blocks(self, stream):
+        # Yields (lines, line_numbers) for every '---' delimited block: its
+        # non-empty stripped segments and the 1-based source line of each.
+        # A UTF-8 BOM (files saved by Notepad) is dropped from the first line,
+        # so every entry point reads such files alike.
+        lines = []
+        numbers = []
+        for number, raw_line in enumerate(stream, 1):
+            if isinstance(raw_line, bytes):
+                raw_line = raw_line.decode('utf-8')
+            if number == 1 and raw_line.startswith('\ufeff'):
+                raw_line = raw_line[1:]
+            segments = raw_line.split('---')
+            for i, segment in enumerate(segments):
+                if i > 0:
+                    yield lines, numbers
+                    lines = []
+                    numbers = []
+                segment = segment.strip()
+                if segment:
+                    lines.append(segment)
+                    numbers.append(number)
+
+        yield lines, numbers
+
+    def _build_question(self, lines):
+        if len(lines) < 7:
+            return None
+        return {
+            'id': int(lines[0]),
+            'text': lines[1],
+            'options': lines[2:6],
+            'correct_option': lines[6],
+            'solution': lines[7] if len(lines) > 7 else NO_SOLUTION
+        }
+
+    def parse_stream(self, stream):
+        try:
+            return list(self.iter_questions(stream))
+        except Exception as e:
+            raise Exception(f'TXT पार्स करने में त्रुटि: {str(e)}')
+
+    def parse_txt_content(self, txt_content):
+        return self.parse_stream(io.StringIO(txt_content))
+
+    def iter_validated(self, stream, diagnostics):
+        # Strict single pass: yields only well-formed questions and appends a
+        # diagnostic dict for every problem to diagnostics. Errors drop their
+        # block, warnings keep the question.
+        seen_ids = {}
+        block = 0
+        for lines, numbers in self._iter_blocks(stream):
+            if not lines:
+                continue
+            block += 1
+            problems = self._validate_block(lines, numbers, seen_ids)
+            for kind, line, message, severity in problems:
+                diagnostics.append({
+                    'line': line,
+                    'block': block,
+                    'kind': kind,
+                    'severity': severity,
+                    'message': message
+                })
+            if not any(severity == 'error' for *_, severity in problems):
+                yield self._build_question(lines)
+
+    def _validate_block(self, lines, numbers, seen_ids):
+        # [(kind, line, message, severity)] for one block.
+        problems = []
+        try:
+            question_id = int(lines[0])
+        except ValueError:
+            problems.append(('non_numeric_id', numbers[0], f'प्रश्न ID संख्या नहीं है: "{lines[0][:40]}"', 'error'))
+        else:
+            if question_id in seen_ids:
+                problems.append(('duplicate_id', numbers[0], f'प्रश्न ID {question_id} दोहराया गया है (पहली बार लाइन {seen_ids[question_id]} पर)।', 'warning'))
+            else:
+                seen_ids[question_id] = numbers[0]
+
+        if len(lines) < 6:
+            problems.append(('missing_options', numbers[-1], f'4 विकल्प चाहिए, केवल {max(len(lines) - 2, 0)} मिले।', 'error'))
+        elif len(lines) == 6:
+            problems.append(('missing_correct_option', numbers[-1], 'सही विकल्प (1-4) नहीं दिया गया।', 'error'))
+        elif lines[6] not in ('1', '2', '3', '4'):
+            problems.append(('invalid_correct_option', numbers[6], f'सही विकल्प 1-4 होना चाहिए, मिला: "{lines[6][:40]}"', 'error'))
+        if len(lines) > 8:
+            problems.append(('extra_lines', numbers[8], f'{len(lines) - 8} अतिरिक्त लाइनें अनदेखी की गईं।', 'warning'))
+        return problems
+
+    def parse_validated(self, stream):
+        # parse_table in strict mode: (QuestionTable, diagnostics).
+        table = QuestionTable()
+        diagnostics = []
+        try:
+            for question in self.iter_validated(stream, diagnostics):
+                table.append(question)
+        except Exception as e:
+            raise Exception(f'TXT पार्स करने में त्रुटि: {str(e)}')
+        return table, diagnostics
+
+    def parse_table(self, stream):
+        # Same as parse_stream, but into a compact QuestionTable.
+        table = QuestionTable()
+        try:
+            for question in self.iter_questions(stream):
+                table.append(question)
+        except Exception as e:
+            raise Exception(f'TXT पार्स करने में त्रुटि: {str(e)}')
+        return table
+
+    def generate_html(self, questions, test_name, duration, category, chunk_url=None, chunk_size=LAZY_CHUNK_SIZE, asset_url=None, submit_url=None, sw_url=None, questions_json=None):
+        # questions is a QuestionTable or a list of question dicts. With
+        # chunk_url set, only the first chunk_size questions are embedded and
+        # the page fetches the rest from chunk_url ('{chunk}' is replaced by
+        # the chunk index, see iter_chunks). With asset_url set, the shared
+        # stylesheet and script are linked from asset_url + QUIZ_CSS_NAME /
+        # QUIZ_JS_NAME instead of being inlined. With submit_url set the page
+        # posts the candidate's answers there on submit. With sw_url set the
+        # page works offline: it registers that service worker and uses no
+        # remote fonts or icons. questions_json, if given, is the embedded
+        # question data already built by embedded_json.
+        questions = QuestionTable.from_questions(questions)
+        slots = self._template_slots(questions, test_name, duration, category, chunk_url, chunk_size, asset_url, submit_url, sw_url)
+        if questions_json is None:
+            questions_json = self.embedded_json(questions, chunk_url, chunk_size)
+        slots['questions_json'] = questions_json
+        return self._render_template(slots)
+
+    def embedded_json(self, questions, chunk_url=None, chunk_size=LAZY_CHUNK_SIZE):
+        # The question data generate_html embeds: every question, or only the
+        # first chunk_size of a lazy page.
+        questions = QuestionTable.from_questions(questions)
+        return script_json(questions.columns(0, None if chunk_url is None else chunk_size))
+
+    def iter_html(self, questions, test_name, duration, category, chunk_url=None, chunk_size=LAZY_CHUNK_SIZE, asset_url=None, submit_url=None, sw_url=None, stream_batch=500):
+        # Same page as generate_html, but as an iterator of pieces: the shell
+        # first, then the question data in batches, then the closing script.
+        # Slots are computed (and bad settings raised) here, before the
+        # caller sends a status line; the iterator only joins them.
+        questions = QuestionTable.from_questions(questions)
+        slots = self._template_slots(questions, test_name, duration, category, chunk_url, chunk_size, asset_url, submit_url, sw_url)
+        embedded = questions.columns(0, None if chunk_url is None else chunk_size)
+        return self._iter_pieces(slots, embedded, stream_batch)
+
+    def _iter_pieces(self, slots, embedded, stream_batch):
+        pending = []
+        for i, part in enumerate(QUIZ_TEMPLATE_PARTS):
+            if i % 2 == 0:
+                pending.append(part)
+            elif part == 'questions_json':
+                yield ''.join(pending)
+                pending = []
+                yield from self._iter_columns_json(embedded, stream_batch)
+            else:
+                pending.append(slots[part])
+        yield ''.join(pending)
+
+    def iter_variants(self, questions, test_name, duration, category, seeds, asset_url=None, submit_url=None, sw_url=None):
+        # Yields (seed, html) for every seed: the same quiz with questions and
+        # options shuffled as variant_layout(len(questions), seed) says, and
+        # the answer key remapped to match. Slots and the JSON encoding of
+        # every text, option and solution are computed once; a variant only
+        # re-joins them in its own order. Variant pages embed all questions.
+        questions = QuestionTable.from_questions(questions)
+        slots = self._template_slots(questions, test_name, duration, category, None, LAZY_CHUNK_SIZE, asset_url, submit_url, sw_url)
+        encode = json.encoder.encode_basestring
+        escape = escape_script_json
+        texts = [escape(encode(text)) for text in questions.texts]
+        options = [escape(encode(option)) for option in questions.options]
+        solutions = [escape(encode(solution)) for solution in questions.solutions]
+        answers = questions.answers
+        # variant_numbers[k][a]: where base option a (1-4, 0 = no answer)
+        # lands under OPTION_ORDERS[k].
+        variant_numbers = [[0] + [order.index(a) + 1 for a in range(4)] for order in OPTION_ORDERS]
+        for seed in seeds:
+            order, picks = variant_layout(len(questions), seed)
+            slots['questions_json'] = ''.join([
+                '{"texts":[', ','.join([texts[i] for i in order]),
+                '],"options":[', ','.join([options[i * 4 + o] for i, k in zip(order, picks) for o in OPTION_ORDERS[k]]),
+                '],"solutions":[', ','.join([solutions[i] for i in order]), ']}'
+            ])
+            variant_answers = [variant_numbers[k][answers[i]] for i, k in zip(order, picks)]
+            slots['answers_json'] = json.dumps(variant_answers, separators=(',', ':'))
+            if submit_url is not None:
+                slots['submit_url'] = script_json(f'{submit_url}?variant={seed}')
+            yield seed, self._render_template(slots)
+
+    def iter_chunks(self, questions, chunk_size=LAZY_CHUNK_SIZE):
+        # JSON for the lazily loaded chunks 1..n; chunk 0 is embedded in the page.
+        questions = QuestionTable.from_questions(questions)
+        for start in range(chunk_size, len(questions), chunk_size):
+            yield dumps_json(questions.columns(start, start + chunk_size))
+
+    def _iter_columns_json(self, columns, batch_size):
+        # Streams script_json(columns) one batch of values at a time.
+        for n, (name, values) in enumerate(columns.items()):
+            yield ('{' if n == 0 else '],') + json.dumps(name) + ':['
+            for start in range(0, len(values), batch_size):
+                batch = script_json(values[start:start + batch_size])[1:-1]
+                yield (',' if start else '') + batch
+        yield ']}'
+
+    def _template_slots(self, questions, test_name, duration, category, chunk_url, chunk_size, asset_url, submit_url, sw_url=None):
+        total_marks = len(questions)
+        try:
+            minutes = int(duration)
+        except (TypeError, ValueError):
+            raise ValueError(f'अमान्य समय: "{duration}" (मिनट में संख्या डालें)')
+        if asset_url is None:
+            styles = f'<style>{QUIZ_CSS}    </style>'
+            runtime = f'<script>{QUIZ_RUNTIME_JS}    </script>'
+        else:
+            styles = f'<link rel="stylesheet" href="{asset_url}{QUIZ_CSS_NAME}">'
+            runtime = f'<script src="{asset_url}{QUIZ_JS_NAME}"></script>'
+        return {
+            'styles': styles,
+            'runtime': runtime,
+            'test_name': escape_html(str(test_name)),
+            'category': escape_html(str(category)),
+            'total_questions': str(len(questions)),
+            'total_marks': str(total_marks),
+            'duration': escape_html(str(duration)),
+            'time_left': str(minutes * 60),
+            'answers_json': json.dumps(questions.answers.tolist(), separators=(',', ':')),
+            'chunk_url': script_json(chunk_url),
+            'chunk_size': str(chunk_size),
+            'submit_url': script_json(submit_url),
+            'sw_url': script_json(sw_url),
+            'head_links': QUIZ_REMOTE_HEAD if sw_url is None else QUIZ_OFFLINE_HEAD,
+        }
+
+    def _render_template(self, slots):
+        parts = list(QUIZ_TEMPLATE_PARTS)
+        parts[1::2] = [slots[name] for name in parts[1::2]]
+        return ''.join(parts)
+
+class QuizCache:
+    # In-process LRU cache of rendered quizzes, bounded by entry count and by
+    # approximate memory size. Entries are dicts: {'html', 'questions_count'}
+    # plus 'chunks' for lazy pages and 'encoded', the compressed variants
+    # made so far (see negotiated_response).
+    # Each gunicorn worker gets its own copy; see SQLiteQuizCache for a
+    # backend shared by all workers on a host.
+    backend = 'memory'
+
+    def __init__(self, max_entries=128, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def get_chunk(self, key, n):
+        # (body, encoded) of lazy chunk n of the page under key, or None.
+        entry = self.get(key)
+        if entry is None or not 1 <= n <= len(entry.get('chunks', ())):
+            return None
+        return entry['chunks'][n - 1], entry.get('encoded', {})
+
+    def put(self, key, entry):
+        size = entry_size(entry)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old['size']
+            entry = dict(entry, size=size)
+            self.entries[key] = entry
+            self.total_bytes += size
+            self._evict()
+
+    def put_encoded(self, key, kind, encoding, data):
+        # Adds one compressed variant to a cached entry.
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or (kind, encoding) in entry['encoded']:
+                return
+            entry['encoded'][(kind, encoding)] = data
+            entry['size'] += sys.getsizeof(data)
+            self.total_bytes += sys.getsizeof(data)
+            self._evict()
+
+    def _evict(self):
+        while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.total_bytes -= evicted['size']
+            self.evictions += 1
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': self.backend,
+                'entries': len(self.entries),
+                'bytes': self.total_bytes,
+                'maxEntries': self.max_entries,
+                'maxBytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hitRatio': self.hits / lookups if lookups else 0.0
+            }
+
+class SQLiteQuizCache:
+    # LRU cache stored in a sqlite file under a private directory, so every
+    # worker process on the host reads and writes the same entries and
+    # counters. Nothing is unpickled: a page row keeps the JSON fields and
+    # page_parts keeps the html, chunks and compressed variants as plain
+    # text and blobs, deleted together with their page.
+    backend = 'sqlite'
+    # Hits, misses and LRU touches are counted in memory and written at most
+    # this often per process, so reads never queue on the sqlite writer.
+    touch_interval = 5.0
+
+    def __init__(self, directory, max_entries=1024, max_bytes=512 * 1024 * 1024):
+        private_directory(directory)
+        self.path = os.path.join(directory, 'quiz_cache.sqlite3')
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.touched = {}
+        self.pending = {'hits': 0, 'misses': 0}
+        self.flushed_at = time.monotonic()
+        atexit.register(self.flush)
+        with self._connect() as db:
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS pages ('
+                'key TEXT PRIMARY KEY, meta TEXT NOT NULL, '
+                'size INTEGER NOT NULL, last_used REAL NOT NULL)'
+            )
+            db.execute('CREATE INDEX IF NOT EXISTS pages_last_used ON pages (last_used)')
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS page_parts ('
+                'key TEXT NOT NULL, kind TEXT NOT NULL, encoding TEXT NOT NULL, body BLOB NOT NULL, '
+                'PRIMARY KEY (key, kind, encoding))'
+            )
+            db.execute('CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            db.executemany(
+                'INSERT OR IGNORE INTO counters (name, value) VALUES (?, 0)',
+                [('hits',), ('misses',), ('evictions',)]
+            )
+
+    def _connect(self):
+        return sqlite_connection(self.local, self.path)
+
+    def get(self, key):
+        db = self._connect()
+        row = db.execute('SELECT meta FROM pages WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self._touch(None)
+            return None
+        entry = json.loads(row[0])
+        entry['encoded'] = {}
+        chunks = {}
+        for kind, encoding, body in db.execute('SELECT kind, encoding, body FROM page_parts WHERE key = ?', (key,)):
+            if encoding:
+                entry['encoded'][(kind, encoding)] = bytes(body)
+            elif kind == 'html':
+                entry['html'] = body
+            else:
+                chunks[int(kind[len('chunk'):])] = body
+        if chunks:
+            entry['chunks'] = [chunks[n] for n in sorted(chunks)]
+        self._touch(key)
+        return entry
+
+    def get_chunk(self, key, n):
+        # Reads one chunk and its variants without loading the page.
+        db = self._connect()
+        body = None
+        encoded = {}
+        for encoding, data in db.execute(
+            'SELECT encoding, body FROM page_parts WHERE key = ? AND kind = ?', (key, f'chunk{n}')
+        ):
+            if encoding:
+                encoded[(f'chunk{n}', encoding)] = bytes(data)
+            else:
+                body = data
+        self._touch(None if body is None else key)
+        return None if body is None else (body, encoded)
+
+    def put(self, key, entry):
+        meta = {name: value for name, value in entry.items() if name not in ('html', 'chunks', 'encoded', 'size')}
+        parts = [(key, kind, encoding, data) for (kind, encoding), data in entry.get('encoded', {}).items()]
+        if 'html' in entry:
+            parts.append((key, 'html', '', entry['html']))
+        parts.extend((key, f'chunk{n}', '', chunk) for n, chunk in enumerate(entry.get('chunks', ()), 1))
+        meta = json.dumps(meta, ensure_ascii=False)
+        size = len(meta.encode('utf-8')) + sum(
+            len(body) if isinstance(body, bytes) else len(body.encode('utf-8')) for _, _, _, body in parts
+        )
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        with self._connect() as db:
+            db.execute('DELETE FROM page_parts WHERE key = ?', (key,))
+            db.execute(
+                'INSERT OR REPLACE INTO pages (key, meta, size, last_used) VALUES (?, ?, ?, ?)',
+                (key, meta, size, time.time())
+            )
+            db.executemany('INSERT INTO page_parts (key, kind, encoding, body) VALUES (?, ?, ?, ?)', parts)
+            self._evict(db)
+
+    def put_encoded(self, key, kind, encoding, data):
+        # Adds one compressed variant to a cached page, if it is still there.
+        with self._connect() as db:
+            added = db.execute(
+                'INSERT OR IGNORE INTO page_parts (key, kind, encoding, body) '
+                'SELECT ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM pages WHERE key = ?)',
+                (key, kind, encoding, data, key)
+            ).rowcount
+            if added:
+                db.execute('UPDATE pages SET size = size + ? WHERE key = ?', (len(data), key))
+                self._evict(db)
+
+    def _touch(self, key):
+        # Records a hit (key) or miss (None); flushes every touch_interval.
+        now = time.monotonic()
+        with self.lock:
+            if key is None:
+                self.pending['misses'] += 1
+            else:
+                self.pending['hits'] += 1
+                self.touched[key] = time.time()
+            if now - self.flushed_at < self.touch_interval:
+                return
+            self.flushed_at = now
+        self.flush()
+
+    def flush(self):
+        with self.lock:
+            touched, self.touched = self.touched, {}
+            pending, self.pending = self.pending, {'hits': 0, 'misses': 0}
+        with self._connect() as db:
+            db.executemany(
+                'UPDATE pages SET last_used = MAX(last_used, ?) WHERE key = ?',
+                [(used, key) for key, used in touched.items()]
+            )
+            db.executemany(
+                'UPDATE counters SET value = value + ? WHERE name = ?',
+                [(count, name) for name, count in pending.items() if count]
+            )
+
+    def _evict(self, db):
+        count, total = db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages').fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        evicted = []
+        for key, size in db.execute('SELECT key, size FROM pages ORDER BY last_used'):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            count -= 1
+            total -= size
+        db.executemany('DELETE FROM pages WHERE key = ?', evicted)
+        db.executemany('DELETE FROM page_parts WHERE key = ?', evicted)
+        db.execute("UPDATE counters SET value = value + ? WHERE name = 'evictions'", (len(evicted),))
+
+    def stats(self):
+        self.flush()
+        db = self._connect()
+        counters = dict(db.execute('SELECT name, value FROM counters'))
+        count, total = db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages').fetchone()
+        lookups = counters['hits'] + counters['misses']
+        return {
+            'backend': self.backend,
+            'path': self.path,
+            'entries': count,
+            'bytes': total,
+            'maxEntries': self.max_entries,
+            'maxBytes': self.max_bytes,
+            'hits': counters['hits'],
+            'misses': counters['misses'],
+            'evictions': counters['evictions'],
+            'hitRatio': counters['hits'] / lookups if lookups else 0.0
+        }
+
+def private_directory(path):
+    # Creates path readable by this user only and refuses one that another
+    # user owns or can write to: whoever writes the cache picks the HTML
+    # served from it.
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.stat(path)
+    if hasattr(os, 'getuid') and (info.st_uid != os.getuid() or info.st_mode & 0o022):
+        raise ValueError(f'{path} must be owned by this user and not writable by others')
+    return path
+
+def sqlite_connection(local, path):
+    # One connection per thread and per process (gunicorn forks workers).
+    db = getattr(local, 'db', None)
+    if db is None or local.pid != os.getpid():
+        db = sqlite3.connect(path, timeout=30)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        local.db = db
+        local.pid = os.getpid()
+    return db
+
+def entry_size(entry):
+    size = 0
+    for value in (entry.values() if isinstance(entry, dict) else entry):
+        if isinstance(value, (dict, list)):
+            size += entry_size(value)
+        elif isinstance(value, (str, bytes)):
+            size += sys.getsizeof(value)
+    return size
+
+def default_cache_dir():
+    return os.path.join(tempfile.gettempdir(), f'quiz-cache-{getpass.getuser()}')
+
+def default_data_dir():
+    return os.path.join(tempfile.gettempdir(), f'quiz-data-{getpass.getuser()}')
+
+def create_quiz_cache():
+    # QUIZ_CACHE_BACKEND=sqlite shares one cache between all workers on the
+    # host through a file in QUIZ_CACHE_DIR (default: a directory private to
+    # the current user under the temp dir).
+    backend = os.environ.get('QUIZ_CACHE_BACKEND', 'memory')
+    max_entries = os.environ.get('QUIZ_CACHE_MAX_ENTRIES')
+    max_bytes = os.environ.get('QUIZ_CACHE_MAX_BYTES')
+    limits = {}
+    if max_entries is not None:
+        limits['max_entries'] = int(max_entries)
+    if max_bytes is not None:
+        limits['max_bytes'] = int(max_bytes)
+
+    if backend == 'memory':
+        return QuizCache(**limits)
+    if backend == 'sqlite':
+        directory = os.environ.get('QUIZ_CACHE_DIR', default_cache_dir())
+        return SQLiteQuizCache(directory, **limits)
+    raise ValueError(f'Unknown QUIZ_CACHE_BACKEND: {backend}')
+
+# Part of every cache key, so a template change never serves stale pages
+# for an old ETag.
+TEMPLATE_FINGERPRINT = hashlib.sha256((QUIZ_TEMPLATE + QUIZ_ASSET_FINGERPRINT).encode('utf-8')).hexdigest()
+
+def quiz_cache_hasher(test_name, duration, category, options=None):
+    # Returns a sha256 primed with the quiz settings and render options; the
+    # caller feeds it the raw TXT bytes (possibly while streaming) and takes
+    # hexdigest() as key.
+    hasher = hashlib.sha256(TEMPLATE_FINGERPRINT.encode('ascii'))
+    settings = json.dumps([str(test_name), str(duration), str(category), options or {}], ensure_ascii=False, sort_keys=True)
+    hasher.update(settings.encode('utf-8') + b'\n')
+    return hasher
+
+class HashingReader:
+    # Wraps a stream and hashes every line as the parser consumes it.
+    def __init__(self, stream, hasher):
+        self.stream = stream
+        self.hasher = hasher
+
+    def __iter__(self):
+        for line in self.stream:
+            self.hasher.update(line if isinstance(line, bytes) else line.encode('utf-8'))
+            yield line
+
+class QuizJob:
+    def __init__(self, key, settings, options, job_id=None):
+        self.id = job_id or uuid.uuid4().hex
+        self.key = key
+        self.settings = settings
+        self.options = options
+        self.status = 'queued'
+        self.progress = 0
+        self.questions_count = None
+        self.error = None
+        self.diagnostics = None
+
+    def to_dict(self):
+        result = {
+            'jobId': self.id,
+            'status': self.status,
+            'progress': self.progress,
+            'questionsCount': self.questions_count,
+            'error': self.error
+        }
+        if self.diagnostics is not None:
+            result.update(self.diagnostics)
+        return result
+
+class JobManager:
+    # Runs large conversions on a bounded thread pool so the request that
+    # submits them returns at once. Job state is kept in a sqlite file under
+    # QUIZ_DATA_DIR, so any gunicorn worker can answer for a job another one
+    # runs; the finished page itself is only in quiz_cache, under the
+    # content key. Execution is not shared: a job lives in the executor of
+    # the worker that accepted it, which keeps updated_at fresh while the job
+    # is queued or running. A job whose worker went away (restart, deploy,
+    # OOM) stops being touched and is failed by get().
+    # Progress is written at most this often while a job parses.
+    progress_interval = 0.5
+    heartbeat_interval = 10
+    stale_after = 60
+
+    def __init__(self, directory, max_workers=2, max_jobs=100):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, 'jobs.sqlite3')
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='quiz-job')
+        self.max_jobs = max_jobs
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.active = set()
+        self.heartbeat_pid = None
+        with self._connect() as db:
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'id TEXT PRIMARY KEY, key TEXT NOT NULL, settings TEXT NOT NULL, options TEXT NOT NULL, '
+                'status TEXT NOT NULL, progress INTEGER NOT NULL, questions_count INTEGER, error TEXT, '
+                'diagnostics TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)'
+            )
+            db.execute('CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created_at)')
+
+    def _connect(self):
+        return sqlite_connection(self.local, self.path)
+
+    def get(self, job_id):
+        row = self._connect().execute(
+            'SELECT key, settings, options, status, progress, questions_count, error, diagnostics, updated_at '
+            'FROM jobs WHERE id = ?', (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = QuizJob(row[0], tuple(json.loads(row[1])), json.loads(row[2]), job_id)
+        job.status, job.progress, job.questions_count, job.error = row[3:7]
+        job.diagnostics = None if row[7] is None else json.loads(row[7])
+        if job.status not in ('done', 'error') and row[8] < time.time() - self.stale_after:
+            job.status = 'error'
+            job.error = 'सर्वर दोबारा शुरू होने से जॉब पूरा नहीं हो सका! कृपया फ़ाइल दोबारा भेजें।'
+            self.save(job)
+        return job
+
+    def create(self, key, settings, options=None):
+        job = QuizJob(key, settings, options or {})
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                'INSERT INTO jobs (id, key, settings, options, status, progress, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, 0, ?, ?)',
+                (job.id, key, json.dumps(list(settings), ensure_ascii=False), json.dumps(job.options), job.status, now, now)
+            )
+            # Forget the oldest finished or abandoned jobs once the history
+            # is full.
+            db.execute(
+                "DELETE FROM jobs WHERE (status IN ('done', 'error') OR updated_at < ?) AND id NOT IN "
+                '(SELECT id FROM jobs ORDER BY created_at DESC LIMIT ?)', (now - self.stale_after, self.max_jobs)
+            )
+        return job
+
+    def save(self, job):
+        with self._connect() as db:
+            db.execute(
+                'UPDATE jobs SET status = ?, progress = ?, questions_count = ?, error = ?, diagnostics = ?, '
+                'updated_at = ? WHERE id = ?',
+                (job.status, job.progress, job.questions_count, job.error,
+                 None if job.diagnostics is None else json.dumps(job.diagnostics, ensure_ascii=False),
+                 time.time(), job.id)
+            )
+
+    def submit(self, job, source):
+        with self.lock:
+            self.active.add(job.id)
+            # Threads do not survive gunicorn's fork, so each worker starts its own.
+            if self.heartbeat_pid != os.getpid():
+                self.heartbeat_pid = os.getpid()
+                threading.Thread(target=self._heartbeat_loop, name='quiz-job-heartbeat', daemon=True).start()
+        self.executor.submit(self.run, job, source)
+
+    def _heartbeat_loop(self):
+        while True:
+            time.sleep(self.heartbeat_interval)
+            with self.lock:
+                job_ids = list(self.active)
+            if not job_ids:
+                continue
+            try:
+                with self._connect() as db:
+                    db.execute(
+                        f'UPDATE jobs SET updated_at = ? WHERE id IN ({",".join("?" * len(job_ids))})',
+                        [time.time()] + job_ids
+                    )
+            except sqlite3.Error:
+                app.logger.exception('Could not record the heartbeat of %d jobs', len(job_ids))
+
+    def run(self, job, source):
+        saved_at = time.monotonic()
+
+        def progress(count):
+            nonlocal saved_at
+            job.progress = count
+            if time.monotonic() - saved_at >= self.progress_interval:
+                saved_at = time.monotonic()
+                self.save(job)
+
+        diagnostics = None
+        try:
+            job.status = 'running'
+            self.save(job)
+            source.seek(0, os.SEEK_END)
+            size = source.tell()
+            source.seek(0)
+            if job.options.get('strict'):
+                # Diagnostics need the serial validating parser.
+                questions = QuestionTable()
+                diagnostics = []
+                try:
+                    for question in converter.iter_validated(source, diagnostics):
+                        questions.append(question)
+                        progress(len(questions))
+                except Exception as e:
+                    raise Exception(f'TXT पार्स करने में त्रुटि: {str(e)}')
+            elif use_parallel_parse(size):
+                questions = parse_parallel(source.read(), get_batch_pool(), progress=progress)
+            else:
+                questions = QuestionTable()
+                try:
+                    for question in converter.iter_questions(source):
+                        questions.append(question)
+                        progress(len(questions))
+                except Exception as e:
+                    raise Exception(f'TXT पार्स करने में त्रुटि: {str(e)}')
+
+            job.progress = len(questions)
+            if diagnostics is not None:
+                job.diagnostics = diagnostics_json(diagnostics)
+            if not questions:
+                raise Exception('कोई वैध प्रश्न नहीं मिले! कृपया फॉर्मेट चेक करें।')
+
+            job.status = 'rendering'
+            self.save(job)
+            entry = build_entry(job.key, questions, *job.settings, job.options, diagnostics)
+            quiz_cache.put(job.key, entry)
+            job.questions_count = len(questions)
+            job.status = 'done'
+        except Exception as e:
+            job.error = str(e)
+            job.status = 'error'
+        finally:
+            source.close()
+            self.save(job)
+            with self.lock:
+                self.active.discard(job.id)
+
+    def finish_cached(self, job, entry):
+        job.progress = job.questions_count = entry['questions_count']
+        if 'diagnostics' in entry:
+            job.diagnostics = entry['diagnostics']
+        job.status = 'done'
+        self.save(job)
+
+# The 24 orders of four options; a variant picks one per question.
+OPTION_ORDERS = [bytes(order) for order in itertools.permutations(range(4))]
+
+def variant_layout(count, seed):
+    # Question and option order of one variant, rebuilt from its seed alone:
+    # variant position n shows base question order[n] with its options in
+    # OPTION_ORDERS[picks[n]] (variant option j is base option order[j],
+    # both 0-based). Not cached across requests: a layout is as large as the
+    # quiz, and submit_answers builds each one at most once per request.
+    rng = random.Random(seed)
+    order = list(range(count))
+    rng.shuffle(order)
+    return order, rng.choices(range(len(OPTION_ORDERS)), k=count)
+
+def base_answers(given, layout):
+    # Maps answers given on a variant (layout from variant_layout) back to
+    # base question and option numbers, so variants are scored and rolled up
+    # like the base quiz.
+    order, picks = layout
+    base = bytearray(len(order))
+    for n, answer in enumerate(given):
+        if answer:
+            base[order[n]] = OPTION_ORDERS[picks[n]][answer - 1] + 1
+    return bytes(base)
+
+def answer_key_bytes(questions):
+    # Precomputed answer array for scoring: one byte per question holding the
+    # correct option (1-4), or 0xff where the bank had no valid answer so that
+    # it never matches a given answer.
+    return bytes(answer if answer > 0 else 0xff for answer in questions.answers)
+
+def score_answers(answer_key, given):
+    # given is one byte per answered question (0 = skipped), at most as long
+    # as answer_key. Returns (correct, incorrect, skipped).
+    given = given.ljust(len(answer_key), b'\0')
+    correct = sum(map(operator.eq, answer_key, given))
+    skipped = given.count(0)
+    return correct, len(answer_key) - correct - skipped, skipped
+
+def rollup_answers(givens, total):
+    # Per-question counts for a batch of answer strings of one quiz, taken
+    # column by column: [(question, skipped, option_1, ..., option_4)].
+    padded = [given.ljust(total, b'\0') for given in givens]
+    rows = []
+    for question, column in enumerate(zip(*padded)):
+        column = bytes(column)
+        rows.append((question, column.count(0), column.count(1), column.count(2), column.count(3), column.count(4)))
+    return rows
+
+class SubmissionStore:
+    # Answer keys and scored submissions in a sqlite file under
+    # QUIZ_DATA_DIR. Submissions are scored in the request and queued; one
+    # writer thread per process drains the queue and inserts everything
+    # waiting in a single transaction (a group commit). A bulk POST is one
+    # transaction; single submissions share one only when the same process
+    # serves them concurrently (threaded workers). Sync gunicorn workers
+    # handle one request at a time, so there each request still costs its
+    # own commit. Each request waits for its own transaction, so a returned
+    # submission id is a receipt for a stored row. The same
+    # transaction adds the batch to per-quiz and per-question rollups, which
+    # analytics reads instead of scanning submissions.
+    def __init__(self, directory, batch_size=1000, max_answer_keys=256):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, 'submissions.sqlite3')
+        self.batch_size = batch_size
+        self.max_answer_keys = max_answer_keys
+        self.answer_keys = OrderedDict()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.pending = queue.Queue()
+        self.writer_pid = None
+        with self._connect() as db:
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS answer_keys (quiz_key TEXT PRIMARY KEY, answers BLOB NOT NULL, '
+                'variant_start INTEGER NOT NULL DEFAULT 0, variant_count INTEGER NOT NULL DEFAULT 0)'
+            )
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS submissions ('
+                'id TEXT PRIMARY KEY, quiz_key TEXT NOT NULL, candidate TEXT, answers BLOB NOT NULL, '
+                'correct INTEGER NOT NULL, incorrect INTEGER NOT NULL, skipped INTEGER NOT NULL, '
+                'time_taken INTEGER, submitted_at REAL NOT NULL, variant INTEGER)'
+            )
+            db.execute('CREATE INDEX IF NOT EXISTS submissions_quiz ON submissions (quiz_key, submitted_at)')
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS quiz_rollups ('
+                'quiz_key TEXT PRIMARY KEY, attempts INTEGER NOT NULL, correct INTEGER NOT NULL, '
+                'incorrect INTEGER NOT NULL, skipped INTEGER NOT NULL)'
+            )
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS question_rollups ('
+                'quiz_key TEXT NOT NULL, question INTEGER NOT NULL, skipped INTEGER NOT NULL, '
+                'option_1 INTEGER NOT NULL, option_2 INTEGER NOT NULL, option_3 INTEGER NOT NULL, '
+                'option_4 INTEGER NOT NULL, PRIMARY KEY (quiz_key, question))'
+            )
+
+    def _connect(self):
+        return sqlite_connection(self.local, self.path)
+
+    def put_answer_key(self, quiz_key, answer_key, variants=range(0)):
+        # variants: the seeds /variants issued for this key; submissions for
+        # any other seed are refused.
+        with self._connect() as db:
+            db.execute(
+                'INSERT OR REPLACE INTO answer_keys (quiz_key, answers, variant_start, variant_count) VALUES (?, ?, ?, ?)',
+                (quiz_key, answer_key, variants.start, len(variants))
+            )
+        self._remember(quiz_key, (answer_key, variants))
+
+    def get_answer_key(self, quiz_key):
+        # (answer key bytes, issued variant seeds as a range), or None.
+        with self.lock:
+            found = self.answer_keys.get(quiz_key)
+            if found is not None:
+                self.answer_keys.move_to_end(quiz_key)
+                return found
+        row = self._connect().execute(
+            'SELECT answers, variant_start, variant_count FROM answer_keys WHERE quiz_key = ?', (quiz_key,)
+        ).fetchone()
+        if row is None:
+            return None
+        found = (bytes(row[0]), range(row[1], row[1] + row[2]))
+        self._remember(quiz_key, found)
+        return found
+
+    def _remember(self, quiz_key, found):
+        with self.lock:
+            self.answer_keys[quiz_key] = found
+            self.answer_keys.move_to_end(quiz_key)
+            while len(self.answer_keys) > self.max_answer_keys:
+                self.answer_keys.popitem(last=False)
+
+    def add(self, quiz_key, answer_key, submissions):
+        # submissions: [(candidate, given bytes, time_taken, variant)], given
+        # in base question order. Scores them, queues the rows and returns the
+        # results once the writer has committed them; raises if it could not.
+        self._start_writer()
+        now = time.time()
+        rows = []
+        results = []
+        for candidate, given, time_taken, variant in submissions:
+            correct, incorrect, skipped = score_answers(answer_key, given)
+            submission_id = uuid.uuid4().hex
+            rows.append((submission_id, quiz_key, candidate, given, correct, incorrect, skipped, time_taken, now, variant))
+            results.append({
+                'submissionId': submission_id,
+                'candidate': candidate,
+                'variant': variant,
+                'score': correct,
+                'total': len(answer_key),
+                'correct': correct,
+                'incorrect': incorrect,
+                'skipped': skipped
+            })
+        write = {'rows': rows, 'done': threading.Event(), 'error': None}
+        self.pending.put(write)
+        write['done'].wait()
+        if write['error'] is not None:
+            raise write['error']
+        return results
+
+    def page(self, quiz_key, limit=100, offset=0):
+        self.flush()
+        db = self._connect()
+        total = db.execute('SELECT COUNT(*) FROM submissions WHERE quiz_key = ?', (quiz_key,)).fetchone()[0]
+        rows = db.execute(
+            'SELECT id, candidate, correct, incorrect, skipped, time_taken, submitted_at, variant FROM submissions '
+            'WHERE quiz_key = ? ORDER BY submitted_at, id LIMIT ? OFFSET ?',
+            (quiz_key, limit, offset)
+        ).fetchall()
+        return total, [{
+            'submissionId': row[0],
+            'candidate': row[1],
+            'score': row[2],
+            'correct': row[2],
+            'incorrect': row[3],
+            'skipped': row[4],
+            'timeTaken': row[5],
+            'submittedAt': row[6],
+            'variant': row[7]
+        } for row in rows]
+
+    def _add_rollups(self, db, rows):
+        by_quiz = {}
+        for row in rows:
+            by_quiz.setdefault(row[1], []).append(row)
+        for quiz_key, quiz_rows in by_quiz.items():
+            db.execute(
+                'INSERT INTO quiz_rollups (quiz_key, attempts, correct, incorrect, skipped) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (quiz_key) DO UPDATE SET attempts = attempts + excluded.attempts, '
+                'correct = correct + excluded.correct, incorrect = incorrect + excluded.incorrect, '
+                'skipped = skipped + excluded.skipped',
+                (quiz_key, len(quiz_rows), sum(row[4] for row in quiz_rows),
+                 sum(row[5] for row in quiz_rows), sum(row[6] for row in quiz_rows))
+            )
+            total = quiz_rows[0][4] + quiz_rows[0][5] + quiz_rows[0][6]
+            db.executemany(
+                'INSERT INTO question_rollups (quiz_key, question, skipped, option_1, option_2, option_3, option_4) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (quiz_key, question) DO UPDATE SET skipped = skipped + excluded.skipped, '
+                'option_1 = option_1 + excluded.option_1, option_2 = option_2 + excluded.option_2, '
+                'option_3 = option_3 + excluded.option_3, option_4 = option_4 + excluded.option_4',
+                [(quiz_key,) + counts for counts in rollup_answers([row[3] for row in quiz_rows], total)]
+            )
+
+    def analytics(self, quiz_key, answer_key):
+        # Reads only the rollups: (summary dict, per-question dicts).
+        db = self._connect()
+        row = db.execute(
+            'SELECT attempts, correct, incorrect, skipped FROM quiz_rollups WHERE quiz_key = ?', (quiz_key,)
+        ).fetchone() or (0, 0, 0, 0)
+        attempts = row[0]
+        summary = {
+            'attempts': attempts,
+            'totalQuestions': len(answer_key),
+            'averageScore': row[1] / attempts if attempts else 0.0,
+            'correct': row[1],
+            'incorrect': row[2],
+            'skipped': row[3]
+        }
+        counts = {
+            question: options for question, *options in db.execute(
+                'SELECT question, skipped, option_1, option_2, option_3, option_4 '
+                'FROM question_rollups WHERE quiz_key = ?', (quiz_key,)
+            )
+        }
+        questions = []
+        for question, correct_option in enumerate(answer_key):
+            skipped, *options = counts.get(question, (0, 0, 0, 0, 0))
+            correct_option = correct_option if correct_option <= 4 else None
+            correct = options[correct_option - 1] if correct_option else 0
+            questions.append({
+                'question': question + 1,
+                'correctOption': correct_option,
+                'attempts': attempts,
+                'correct': correct,
+                'percentCorrect': 100.0 * correct / attempts if attempts else 0.0,
+                'skipped': skipped,
+                'skipRate': 100.0 * skipped / attempts if attempts else 0.0,
+                'options': options
+            })
+        return summary, questions
+
+    def flush(self):
+        # Blocks until every queued submission of this process is written.
+        self.pending.join()
+
+    def _start_writer(self):
+        # Threads do not survive gunicorn's fork, so each worker starts its own.
+        with self.lock:
+            if self.writer_pid != os.getpid():
+                self.writer_pid = os.getpid()
+                threading.Thread(target=self._write_loop, name='quiz-submissions', daemon=True).start()
+
+    def _write_loop(self):
+        while True:
+            writes = [self.pending.get()]
+            rows = list(writes[0]['rows'])
+            while len(rows) < self.batch_size:
+                try:
+                    writes.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+                rows.extend(writes[-1]['rows'])
+            try:
+                with self._connect() as db:
+                    db.executemany(
+                        'INSERT INTO submissions (id, quiz_key, candidate, answers, correct, incorrect, skipped, '
+                        'time_taken, submitted_at, variant) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows
+                    )
+                    self._add_rollups(db, rows)
+            except Exception as e:
+                app.logger.exception('Could not store %d quiz submissions', len(rows))
+                for write in writes:
+                    write['error'] = e
+            finally:
+                for write in writes:
+                    write['done'].set()
+                    self.pending.task_done()
+
+def load_owner_secret(directory):
+    # QUIZ_OWNER_SECRET, else a random secret kept in QUIZ_DATA_DIR. It is
+    # created once (link fails if another worker got there first), so every
+    # worker signs with the same one.
+    secret = os.environ.get('QUIZ_OWNER_SECRET')
+    if secret:
+        return secret.encode('utf-8')
+    path = os.path.join(directory, 'owner_secret')
+    if not os.path.exists(path):
+        fd, tmp = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(os.urandom(32))
+            os.link(tmp, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp)
+    with open(path, 'rb') as f:
+        return f.read()
+
+def question_hash(text, options):
+    # Dedupe key: question text and options, case-folded with whitespace
+    # collapsed.
+    normalized = '\x1f'.join(' '.join(part.split()).casefold() for part in [text, *options])
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+class QuestionBank:
+    # Parsed questions kept in a sqlite file under QUIZ_DATA_DIR so quizzes
+    # can be assembled from them without re-parsing TXT. Questions are
+    # deduplicated by question_hash and tagged with every category they were
+    # imported under. Keyword search uses an FTS5 trigram index (substring
+    # matches work for Hindi too); without FTS5, or for keywords shorter than
+    # a trigram, it falls back to a LIKE scan.
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, 'question_bank.sqlite3')
+        self.local = threading.local()
+        with self._connect() as db:
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS bank_questions ('
+                'id INTEGER PRIMARY KEY, text_hash TEXT NOT NULL UNIQUE, text TEXT NOT NULL, '
+                'option_1 TEXT NOT NULL, option_2 TEXT NOT NULL, option_3 TEXT NOT NULL, option_4 TEXT NOT NULL, '
+                'answer INTEGER NOT NULL, solution TEXT NOT NULL, added_at REAL NOT NULL)'
+            )
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS bank_categories ('
+                'category TEXT NOT NULL, question_id INTEGER NOT NULL, PRIMARY KEY (category, question_id))'
+            )
+            try:
+                db.execute(
+                    'CREATE VIRTUAL TABLE IF NOT EXISTS bank_search USING fts5('
+                    "text, content='bank_questions', content_rowid='id', tokenize='trigram')"
+                )
+                self.fts = True
+            except sqlite3.OperationalError:
+                self.fts = False
+
+    def _connect(self):
+        return sqlite_connection(self.local, self.path)
+
+    def import_questions(self, questions, category):
+        # Returns (added, duplicates). A duplicate still gets the category.
+        questions = QuestionTable.from_questions(questions)
+        added = duplicates = 0
+        now = time.time()
+        with self._connect() as db:
+            for index in range(len(questions)):
+                text = questions.texts[index]
+                options = questions.options[index * 4:index * 4 + 4]
+                text_hash = question_hash(text, options)
+                cursor = db.execute(
+                    'INSERT OR IGNORE INTO bank_questions '
+                    '(text_hash, text, option_1, option_2, option_3, option_4, answer, solution, added_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (text_hash, text, *options, questions.answers[index], questions.solutions[index], now)
+                )
+                if cursor.rowcount:
+                    question_id = cursor.lastrowid
+                    added += 1
+                    if self.fts:
+                        db.execute('INSERT INTO bank_search (rowid, text) VALUES (?, ?)', (question_id, text))
+                else:
+                    question_id = db.execute('SELECT id FROM bank_questions WHERE text_hash = ?', (text_hash,)).fetchone()[0]
+                    duplicates += 1
+                db.execute('INSERT OR IGNORE INTO bank_categories (category, question_id) VALUES (?, ?)', (category, question_id))
+        return added, duplicates
+
+    def categories(self):
+        db = self._connect()
+        total = db.execute('SELECT COUNT(*) FROM bank_questions').fetchone()[0]
+        rows = db.execute('SELECT category, COUNT(*) FROM bank_categories GROUP BY category ORDER BY category')
+        return total, [{'category': category, 'questions': count} for category, count in rows]
+
+    def select(self, category=None, keyword=None, count=None, sample=False, seed=None):
+        # Ids of matching questions in import order, or a random sample of
+        # them (reproducible with seed). Only ids are read here.
+        conditions = []
+        params = []
+        if category:
+            conditions.append('id IN (SELECT question_id FROM bank_categories WHERE category = ?)')
+            params.append(category)
+        if keyword and self.fts and len(keyword) >= 3:
+            conditions.append('id IN (SELECT rowid FROM bank_search WHERE bank_search MATCH ?)')
+            params.append('"' + keyword.replace('"', '""') + '"')
+        elif keyword:
+            conditions.append("text LIKE ? ESCAPE '\\'")
+            params.append('%' + re.sub(r'([%_\\])', r'\\\1', keyword) + '%')
+        where = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+        ids = [row[0] for row in self._connect().execute(f'SELECT id FROM bank_questions {where} ORDER BY id', params)]
+        if count is None or count > len(ids):
+            count = len(ids)
+        if sample:
+            return random.Random(seed).sample(ids, count)
+        return ids[:count]
+
+    def load(self, ids):
+        # QuestionTable of the given questions in the given order, numbered
+        # from 1.
+        db = self._connect()
+        rows = {}
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            rows.update((row[0], row[1:]) for row in db.execute(
+                'SELECT id, text, option_1, option_2, option_3, option_4, answer, solution FROM bank_questions '
+                f'WHERE id IN ({",".join("?" * len(batch))})', batch
+            ))
+        table = QuestionTable()
+        for number, question_id in enumerate(ids, 1):
+            text, *options, answer, solution = rows[question_id]
+            table.append({
+                'id': number,
+                'text': text,
+                'options': options,
+                'correct_option': answer,
+                'solution': solution
+            })
+        return table
+
+# Histogram buckets: seconds, bytes and question counts.
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(10))
+COUNT_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+
+METRICS = {
+    'quiz_requests_total': ('counter', 'HTTP requests by endpoint and status.', None),
+    'quiz_request_seconds': ('histogram', 'Request handling time by endpoint (streamed bodies excluded).', TIME_BUCKETS),
+    'quiz_stage_seconds': ('histogram', 'Time spent in each stage of building a quiz.', TIME_BUCKETS),
+    'quiz_request_bytes': ('histogram', 'Request body size by endpoint.', SIZE_BUCKETS),
+    'quiz_questions': ('histogram', 'Questions parsed per request.', COUNT_BUCKETS),
+    'quiz_cache_lookups_total': ('counter', 'Rendered quiz lookups: hit, miss or not_modified.', None),
+    'quiz_errors_total': ('counter', 'Failed requests by error type.', None),
+}
+
+class Metrics:
+    # Counters and histograms in Prometheus text format. Each process keeps
+    # its own values in memory; with a directory set, a background thread
+    # writes them to <directory>/metrics-<pid>-<id>.json every
+    # flush_interval seconds and render() sums the files of every worker, so
+    # /metrics is the same whichever gunicorn worker answers. The id is new
+    # in every process, so a reused pid never overwrites an exited worker's
+    # file; those files are folded into metrics-merged.json once their pid
+    # is gone, so counters never go backwards. Process-pool children keep no
+    # values.
+    def __init__(self, directory=None, flush_interval=1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.pid = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _values(self):
+        # Values of this process, reset in a forked child.
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.file_name = f'metrics-{self.pid}-{uuid.uuid4().hex[:12]}.json'
+            self.counters = {}
+            self.histograms = {}
+            self.dirty = False
+            if self.directory and multiprocessing.parent_process() is None:
+                threading.Thread(target=self._flush_loop, daemon=True).start()
+        return self.counters, self.histograms
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            counters, _ = self._values()
+            counters[key] = counters.get(key, 0) + value
+            self.dirty = True
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        buckets = METRICS[name][2]
+        with self.lock:
+            _, histograms = self._values()
+            histogram = histograms.get(key)
+            if histogram is None:
+                histogram = histograms[key] = [[0] * len(buckets), 0.0, 0]
+            # Counts are per bucket here and made cumulative in render().
+            index = bisect.bisect_left(buckets, value)
+            if index < len(buckets):
+                histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+            self.dirty = True
+
+    def snapshot(self):
+        with self.lock:
+            counters, histograms = self._values()
+            return {
+                'counters': [[name, labels, value] for (name, labels), value in counters.items()],
+                'histograms': [[name, labels, h[0][:], h[1], h[2]] for (name, labels), h in histograms.items()]
+            }
+
+    def flush(self):
+        if not self.directory or self.pid != os.getpid() or multiprocessing.parent_process() is not None:
+            return
+        with self.lock:
+            self.dirty = False
+        self._write(self.file_name, self.snapshot())
+
+    def _flush_loop(self):
+        pid = os.getpid()
+        while self.pid == pid:
+            time.sleep(self.flush_interval)
+            if self.dirty:
+                try:
+                    self.flush()
+                except OSError:
+                    app.logger.exception('Could not write metrics')
+
+    def _write(self, name, snapshot):
+        with tempfile.NamedTemporaryFile('w', dir=self.directory, suffix='.tmp', delete=False) as f:
+            json.dump(snapshot, f)
+        os.replace(f.name, os.path.join(self.directory, name))
+
+    def _read(self, name):
+        try:
+            with open(os.path.join(self.directory, name)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def collect(self):
+        # Snapshots of every worker: metrics-merged.json and the files in the
+        # directory, with this process's own file replaced by its live values.
+        # Files of exited processes are folded on the way.
+        snapshots = [self.snapshot()]
+        if not self.directory:
+            return snapshots
+        live = []
+        exited = []
+        for name in os.listdir(self.directory):
+            if not name.startswith('metrics-') or not name.endswith('.json') or name == 'metrics-merged.json':
+                continue
+            if name == self.file_name:
+                continue
+            pid = name[len('metrics-'):-len('.json')].split('-')[0]
+            (live if not pid.isdigit() or process_alive(int(pid)) else exited).append(name)
+        if exited and fcntl is not None:
+            self._fold(exited)
+        else:
+            live.extend(exited)
+        for name in ['metrics-merged.json'] + live:
+            snapshot = self._read(name)
+            if snapshot is not None:
+                snapshots.append(snapshot)
+        return snapshots
+
+    def _fold(self, names):
+        # Adds the files of exited processes to metrics-merged.json and
+        # deletes them. The lock keeps two workers from folding one file; the
+        # folded names are recorded with the totals, so a file is never
+        # counted twice even if deleting it fails.
+        with open(os.path.join(self.directory, 'metrics.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            merged = self._read('metrics-merged.json') or {'counters': [], 'histograms': [], 'folded': []}
+            folded = set(merged.get('folded', []))
+            snapshots = [merged]
+            for name in names:
+                snapshot = None if name in folded else self._read(name)
+                if snapshot is not None:
+                    snapshots.append(snapshot)
+                    folded.add(name)
+            if len(snapshots) > 1:
+                counters, histograms = merge_snapshots(snapshots)
+                self._write('metrics-merged.json', {
+                    'counters': [[name, labels, value] for (name, labels), value in counters.items()],
+                    'histograms': [[name, labels, h[0], h[1], h[2]] for (name, labels), h in histograms.items()],
+                    'folded': sorted(name for name in folded if os.path.exists(os.path.join(self.directory, name)))
+                })
+            for name in names:
+                with contextlib.suppress(OSError):
+                    os.remove(os.path.join(self.directory, name))
+
+    def render(self):
+        counters, histograms = merge_snapshots(self.collect())
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            if kind == 'counter':
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f'{name}{format_labels(labels)} {value}')
+                continue
+            for (metric, labels), (counts, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for bound, cumulative in zip(buckets, itertools.accumulate(counts)):
+                    lines.append(f'{name}_bucket{format_labels(labels + (("le", repr(float(bound))),))} {cumulative}')
+                lines.append(f'{name}_bucket{format_labels(labels + (("le", "+Inf"),))} {count}')
+                lines.append(f'{name}_sum{format_labels(labels)} {total!r}')
+                lines.append(f'{name}_count{format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+def merge_snapshots(snapshots):
+    # Sums snapshots into ({(name, labels): value}, {(name, labels): [counts, sum, count]}).
+    counters = {}
+    histograms = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, counts, total, count in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            merged = histograms.setdefault(key, [[0] * len(counts), 0.0, 0])
+            merged[0] = list(map(operator.add, merged[0], counts))
+            merged[1] += total
+            merged[2] += count
+    return counters, histograms
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+@contextlib.contextmanager
+def timed_stage(stage):
+    # Times the block into quiz_stage_seconds{stage=...}. Inside a request
+    # the time is also added to the stages logged for slow requests.
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.observe('quiz_stage_seconds', elapsed, stage=stage)
+        if has_request_context():
+            stages = g.setdefault('stage_seconds', {})
+            stages[stage] = stages.get(stage, 0) + elapsed
 
 converter = QuizConverter()
+quiz_cache = create_quiz_cache()
+# Holds the owner secret, answer keys and job state, so it gets the same
+# checks as the cache directory.
+data_dir = private_directory(os.environ.get('QUIZ_DATA_DIR', default_data_dir()))
+submission_store = SubmissionStore(data_dir, batch_size=int(os.environ.get('QUIZ_SUBMIT_BATCH', 1000)))
+owner_secret = load_owner_secret(data_dir)
+atexit.register(submission_store.flush)
+metrics = Metrics(os.environ.get('QUIZ_METRICS_DIR'))
+atexit.register(metrics.flush)
+question_bank = QuestionBank(data_dir)
+job_manager = JobManager(
+    data_dir,
+    max_workers=int(os.environ.get('QUIZ_JOB_WORKERS', 2)),
+    max_jobs=int(os.environ.get('QUIZ_JOB_HISTORY', 100))
+)
+
+# Inputs smaller than this are converted inside the POST /jobs request.
+JOB_SYNC_BYTES = int(os.environ.get('QUIZ_JOB_SYNC_BYTES', 256 * 1024))
+
+def convert_bank(name, data, duration, category, chunk_size=None, asset_url=None, sw_url=None, title=None):
+    # Process-pool worker: converts one TXT bank, named after its file.
+    # Returns (html_name, files, questions_count, error) where files is a
+    # list of (relative path, bytes). With chunk_size set the page is lazy
+    # and its chunks are written as sidecar files in <name>.chunks/. With
+    # asset_url set the page links the shared assets (see asset_files), with
+    # sw_url set it registers that service worker for offline use. data is
+    # the raw bytes, or a QuestionTable already parsed by parse_parallel.
+    # title, if given, is shown instead of the file name.
+    stem = os.path.splitext(os.path.basename(name))[0]
+    test_name = title or stem
+    html_name = stem + '.html'
+    try:
+        if isinstance(data, QuestionTable):
+            questions = data
+        else:
+            questions = converter.parse_table(io.StringIO(data.decode('utf-8-sig')))
+        if not questions:
+            raise Exception('कोई वैध प्रश्न नहीं मिले! कृपया फॉर्मेट चेक करें।')
+        if not chunk_size:
+            html_output = converter.generate_html(questions, test_name, duration, category, asset_url=asset_url, sw_url=sw_url)
+            return html_name, [(html_name, html_output.encode('utf-8'))], len(questions), None
+
+        chunk_dir = stem + '.chunks'
+        chunk_url = quote(chunk_dir) + '/{chunk}.json'
+        html_output = converter.generate_html(questions, test_name, duration, category, chunk_url, chunk_size, asset_url, sw_url=sw_url)
+        files = [(html_name, html_output.encode('utf-8'))]
+        for n, chunk in enumerate(converter.iter_chunks(questions, chunk_size), 1):
+            files.append((f'{chunk_dir}/{n}.json', chunk.encode('utf-8')))
+        return html_name, files, len(questions), None
+    except Exception as e:
+        return html_name, [], 0, str(e)
+
+def usable_cpus():
+    # CPUs this process may actually run on. os.cpu_count() reports the
+    # host's cores inside a container; the affinity mask and a cgroup v2 CPU
+    # quota (how Render and most container hosts limit a service) do not.
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, -(-int(quota) // int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+def process_pool(max_workers=None):
+    # Workers come from a fork server (spawned where there is none) instead
+    # of being forked from this process: a gunicorn worker runs job,
+    # submission-writer and metrics threads, and a child forked while one of
+    # them holds a lock would wait on it forever. The default size is
+    # usable_cpus().
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return ProcessPoolExecutor(max_workers=max_workers or usable_cpus(), mp_context=multiprocessing.get_context(method))
+
+_batch_pool = None
+
+def get_batch_pool():
+    global _batch_pool
+    if _batch_pool is None:
+        workers = os.environ.get('QUIZ_BATCH_WORKERS')
+        _batch_pool = process_pool(int(workers) if workers else None)
+    return _batch_pool
+
+# Inputs at least this big are parsed by parse_parallel, in pieces of about
+# PARALLEL_CHUNK_BYTES.
+PARALLEL_PARSE_BYTES = int(os.environ.get('QUIZ_PARALLEL_PARSE_BYTES', 4 * 1024 * 1024))
+PARALLEL_CHUNK_BYTES = int(os.environ.get('QUIZ_PARALLEL_CHUNK_BYTES', 1024 * 1024))
+
+def use_parallel_parse(size):
+    # With one usable CPU the pool only adds pickling and merging (bench.py
+    # parse: 0.56x the serial speed for 50,000 questions), so it is kept for
+    # hosts with more.
+    return size >= PARALLEL_PARSE_BYTES and usable_cpus() > 1
+
+def split_blocks(data, chunk_bytes):
+    # Cuts TXT bytes into pieces of about chunk_bytes. Each cut is made at
+    # the first '---' of a line, exactly where iter_questions ends a block,
+    # so the pieces parse independently to the same questions in order.
+    pieces = []
+    start = 0
+    while len(data) - start > chunk_bytes:
+        line_start = data.find(b'\n', start + chunk_bytes) + 1
+        cut = data.find(b'---', line_start) if line_start else -1
+        if cut < 0:
+            break
+        pieces.append(data[start:cut])
+        start = cut + 3
+    pieces.append(data[start:])
+    return pieces
+
+def parse_chunk(data):
+    # Process-pool worker for parse_parallel.
+    return converter.parse_table(io.BytesIO(data))
+
+def parse_parallel(data, pool, chunk_bytes=None, progress=None):
+    # Parses TXT bytes on a process pool, one piece from split_blocks per
+    # task, and merges the tables in input order. progress, if given, is
+    # called with the number of questions merged so far.
+    futures = [pool.submit(parse_chunk, piece) for piece in split_blocks(data, chunk_bytes or PARALLEL_CHUNK_BYTES)]
+    questions = QuestionTable()
+    for future in futures:
+        questions.extend(future.result())
+        if progress is not None:
+            progress(len(questions))
+    return questions
+
+def iter_batch(banks, duration, category, chunk_size=None, asset_url=None, pool=None, sw_url=None):
+    # Fans banks out over the process pool and yields results as they finish.
+    # Banks of PARALLEL_PARSE_BYTES or more are first parsed in pieces on the
+    # same pool (see use_parallel_parse), so a single huge bank also uses
+    # every core.
+    pool = pool or get_batch_pool()
+    futures = []
+    large = []
+    for name, data in banks:
+        if use_parallel_parse(len(data)):
+            large.append((name, data))
+        else:
+            futures.append(pool.submit(convert_bank, name, data, duration, category, chunk_size, asset_url, sw_url))
+    for name, data in large:
+        try:
+            data = parse_parallel(data, pool)
+        except Exception:
+            # Usually a parse error, which convert_bank finds again and
+            # reports in the manifest; anything else (a broken pool, a
+            # pickling error) must not vanish into the serial fallback.
+            app.logger.exception('Parallel parse of %s failed; converting it serially', name)
+        futures.append(pool.submit(convert_bank, name, data, duration, category, chunk_size, asset_url, sw_url))
+    for future in as_completed(futures):
+        yield future.result()
+
+# Largest decompressed .txt member, and largest total, taken from uploaded
+# zip archives. Sizes are counted while inflating, not read from the headers.
+ZIP_MEMBER_MAX_BYTES = int(os.environ.get('QUIZ_ZIP_MEMBER_MAX_BYTES', 64 * 1024 * 1024))
+ZIP_TOTAL_MAX_BYTES = int(os.environ.get('QUIZ_ZIP_TOTAL_MAX_BYTES', 256 * 1024 * 1024))
+
+def iter_zip_archive(archive, max_total=None):
+    # Yields (name, bytes) for every .txt member of a zip archive. Raises
+    # ValueError once a member passes ZIP_MEMBER_MAX_BYTES or all of them
+    # together pass max_total (default ZIP_TOTAL_MAX_BYTES).
+    remaining = ZIP_TOTAL_MAX_BYTES if max_total is None else max_total
+    with zipfile.ZipFile(archive) as zf:
+        for info in zf.infolist():
+            if info.is_dir() or not info.filename.lower().endswith('.txt'):
+                continue
+            limit = min(ZIP_MEMBER_MAX_BYTES, remaining)
+            with zf.open(info) as member:
+                data = member.read(limit + 1)
+            if len(data) > limit:
+                raise ValueError(
+                    f'ZIP बहुत बड़ा है: {info.filename} ({ZIP_MEMBER_MAX_BYTES} बाइट प्रति फाइल, '
+                    f'{ZIP_TOTAL_MAX_BYTES} बाइट कुल तक)'
+                )
+            remaining -= len(data)
+            yield info.filename, data
+
+def check_bank_names(banks):
+    # Every bank becomes <stem>.html at the top of the output, so two banks
+    # with the same file name in different folders would collide.
+    seen = set()
+    for name, _ in banks:
+        stem = os.path.splitext(os.path.basename(name))[0]
+        if stem in seen:
+            raise ValueError(f'एक ही नाम की कई फाइलें: {stem}.txt (हर फाइल का नाम अलग रखें)')
+        seen.add(stem)
+
+class ZipStream:
+    # Write-only, non-seekable sink for zipfile; drain() hands back what has
+    # been written so far so the archive can be streamed as it is built.
+    def __init__(self):
+        self.buffer = io.BytesIO()
+        self.offset = 0
+
+    def write(self, data):
+        self.buffer.write(data)
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+def asset_files():
+    # Shared stylesheet and script for pages rendered with asset_url='' (the
+    # assets sit next to the pages).
+    return [(name, body.encode('utf-8')) for name, (_, body) in QUIZ_ASSETS.items()]
+
+def service_worker_file():
+    # Service worker for pages rendered with sw_url=QUIZ_SW_NAME.
+    return (QUIZ_SW_NAME, QUIZ_SW_JS.encode('utf-8'))
+
+def iter_batch_zip(results, extra_files=()):
+    stream = ZipStream()
+    manifest = []
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for path, data in extra_files:
+            zf.writestr(path, data)
+        for html_name, files, questions_count, error in results:
+            manifest.append({'file': html_name, 'questionsCount': questions_count, 'error': error})
+            for path, data in files:
+                zf.writestr(path, data)
+            yield stream.drain()
+        zf.writestr('manifest.json', json.dumps(manifest, ensure_ascii=False, indent=2))
+    yield stream.drain()
+
+def not_modified(key):
+    response = Response(status=304)
+    response.set_etag(key)
+    return response
+
+def render_options():
+    # Render options taken from the query string. They are part of the cache
+    # key. ?lazy=1 embeds only the first chunk and serves the rest from
+    # /quizzes/<key>/chunks/<n>.json on this host. ?assets=external links the
+    # shared stylesheet and script from /static/quiz/ instead of inlining.
+    # ?submit=1 makes the page post answers to /quizzes/<key>/submissions
+    # (the owner token for listing them comes back in X-Quiz-Owner-Token).
+    # ?offline=1 makes a page that keeps working without a connection when
+    # opened from /quizzes/<key>/ (service worker at /quizzes/sw.js).
+    # ?strict=1 parses with diagnostics (see parse_request_bank).
+    options = {}
+    if request.args.get('lazy') in ('1', 'true'):
+        options['lazy'] = True
+        options['chunkSize'] = max(1, int(request.args.get('chunkSize', LAZY_CHUNK_SIZE)))
+        options['baseUrl'] = url_for('index', _external=True)
+    if request.args.get('assets') == 'external':
+        options['assetUrl'] = url_for('index', _external=True) + 'static/quiz/'
+    if request.args.get('submit') in ('1', 'true'):
+        options['submit'] = True
+        options['baseUrl'] = url_for('index', _external=True)
+        # A fresh nonce per generation, so a submit-mode key (and with it the
+        # owner token) cannot be reproduced by re-sending the same request.
+        options['nonce'] = secrets.token_hex(16)
+    if request.args.get('offline') in ('1', 'true'):
+        options['offline'] = True
+        options['baseUrl'] = url_for('index', _external=True)
+    if request.args.get('strict') in ('1', 'true'):
+        options['strict'] = True
+    return options
+
+# Most diagnostics returned with one response; the counts are always exact.
+MAX_DIAGNOSTICS = 1000
+
+def parse_request_bank(stream, options):
+    # (questions, diagnostics); diagnostics is None unless ?strict=1.
+    with timed_stage('parse'):
+        if options.get('strict'):
+            questions, diagnostics = converter.parse_validated(stream)
+        else:
+            questions, diagnostics = converter.parse_table(stream), None
+    metrics.observe('quiz_questions', len(questions))
+    return questions, diagnostics
+
+def diagnostics_json(diagnostics):
+    return {
+        'diagnostics': diagnostics[:MAX_DIAGNOSTICS],
+        'errorCount': sum(1 for d in diagnostics if d['severity'] == 'error'),
+        'warningCount': sum(1 for d in diagnostics if d['severity'] == 'warning')
+    }
+
+def no_questions_response(diagnostics=None):
+    metrics.inc('quiz_errors_total', type='NoQuestions')
+    result = {
+        'success': False,
+        'error': 'कोई वैध प्रश्न नहीं मिले! कृपया फॉर्मेट चेक करें।'
+    }
+    if diagnostics is not None:
+        result.update(diagnostics_json(diagnostics))
+    return jsonify(result)
+
+def render_kwargs(key, options):
+    kwargs = {}
+    if options.get('lazy'):
+        kwargs['chunk_url'] = options['baseUrl'] + f'quizzes/{key}/chunks/{{chunk}}.json'
+        kwargs['chunk_size'] = options['chunkSize']
+    if options.get('assetUrl'):
+        kwargs['asset_url'] = options['assetUrl']
+    if options.get('submit'):
+        kwargs['submit_url'] = options['baseUrl'] + f'quizzes/{key}/submissions'
+    if options.get('offline'):
+        kwargs['sw_url'] = options['baseUrl'] + 'quizzes/sw.js'
+    return kwargs
+
+def render_chunks(questions, kwargs):
+    # Lazy chunks 1..n of a page, or None. They are stored in the page's
+    # cache entry, so the page is never cached without them.
+    if 'chunk_url' not in kwargs:
+        return None
+    return list(converter.iter_chunks(questions, kwargs['chunk_size']))
+
+def store_answer_key(key, questions, kwargs, variants=range(0)):
+    # Pages that submit answers are scored against the key kept in
+    # submission_store, which outlives the quiz cache entry.
+    if 'submit_url' in kwargs:
+        submission_store.put_answer_key(key, answer_key_bytes(questions), variants)
+
+def build_entry(key, questions, test_name, duration, category, options, diagnostics=None):
+    kwargs = render_kwargs(key, options)
+    chunks = render_chunks(questions, kwargs)
+    store_answer_key(key, questions, kwargs)
+    with timed_stage('json'):
+        questions_json = converter.embedded_json(questions, kwargs.get('chunk_url'), kwargs.get('chunk_size', LAZY_CHUNK_SIZE))
+    with timed_stage('render'):
+        html = converter.generate_html(questions, test_name, duration, category, questions_json=questions_json, **kwargs)
+    return new_entry(html, len(questions), diagnostics, chunks, 'sw_url' in kwargs)
+
+def new_entry(html, questions_count, diagnostics=None, chunks=None, offline=False):
+    entry = {'html': html, 'questions_count': questions_count, 'encoded': {}}
+    if offline:
+        entry['offline'] = True
+    if diagnostics is not None:
+        entry['diagnostics'] = diagnostics_json(diagnostics)
+    if chunks:
+        entry['chunks'] = chunks
+    return entry
+
+def envelope_json(entry):
+    envelope = {
+        'success': True,
+        'html': entry['html'],
+        'questionsCount': entry['questions_count']
+    }
+    envelope.update(entry.get('diagnostics', {}))
+    return dumps_json(envelope)
+
+# Content codings this server can produce, best first.
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def compress_text(text, encoding, live=False):
+    data = text.encode('utf-8')
+    if encoding == 'br':
+        return brotli.compress(data, quality=LIVE_BROTLI_QUALITY if live else BROTLI_QUALITY)
+    return gzip.compress(data, LIVE_GZIP_LEVEL if live else GZIP_LEVEL, mtime=0)
+
+def compress_variants(bodies):
+    # {kind: text} -> {(kind, encoding): compressed bytes} in every encoding.
+    return {(kind, encoding): compress_text(text, encoding) for kind, text in bodies.items() for encoding in ENCODINGS}
+
+QUIZ_ASSET_ENCODED = {name: compress_variants({'asset': body}) for name, (_, body) in QUIZ_ASSETS.items()}
+
+def choose_encoding(available):
+    # Best content coding the client accepts among the ones we have.
+    for encoding in ('br', 'gzip'):
+        if encoding in available and request.accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+def negotiated_response(key, kind, identity, encoded, mimetype, headers=None, cache_key=None):
+    # Serves a precompressed variant when the client accepts one. Each
+    # encoding gets its own strong ETag: <key>, <key>-gzip, <key>-br. With
+    # cache_key set, identity is part of that quiz_cache entry: a variant it
+    # does not have yet is compressed now, only in the encoding this client
+    # asked for, and added to the entry for the next request.
+    if cache_key is None:
+        encoding = choose_encoding({enc for (k, enc) in encoded if k == kind})
+    else:
+        encoding = choose_encoding(ENCODINGS)
+    if encoding is None:
+        response = Response(identity, mimetype=mimetype, headers=headers)
+        response.set_etag(key)
+    else:
+        data = encoded.get((kind, encoding))
+        if data is None:
+            with timed_stage('compress'):
+                data = compress_text(identity, encoding, live=True)
+            quiz_cache.put_encoded(cache_key, kind, encoding, data)
+        response = Response(data, mimetype=mimetype, headers=headers)
+        response.headers['Content-Encoding'] = encoding
+        response.set_etag(f'{key}-{encoding}')
+    response.vary.add('Accept-Encoding')
+    return response
+
+def matching_etag(key):
+    for etag in (key, f'{key}-gzip', f'{key}-br'):
+        if request.if_none_match.contains(etag):
+            return etag
+    return None
+
+def gzip_stream(chunks):
+    # A sync flush after every piece sends it at once instead of leaving it
+    # in the compressor's window, so the page shell still arrives first.
+    compressor = zlib.compressobj(LIVE_GZIP_LEVEL, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        yield compressor.compress(chunk.encode('utf-8')) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+def quiz_response(key, questions, test_name, duration, category, options, diagnostics=None):
+    # Cache miss: render, store and answer. ?format=html streams the page as
+    # text/html (gzipped on the fly if accepted); the JSON envelope stays the
+    # default for existing callers and also carries strict-mode diagnostics.
+    if request.args.get('format') == 'html':
+        kwargs = render_kwargs(key, options)
+        lazy_chunks = render_chunks(questions, kwargs)
+        store_answer_key(key, questions, kwargs)
+        chunks = cache_while_streaming(
+            key, len(questions), converter.iter_html(questions, test_name, duration, category, **kwargs),
+            diagnostics, lazy_chunks, 'sw_url' in kwargs
+        )
+        response = Response(
+            mimetype='text/html',
+            headers=quiz_headers(len(questions), None if diagnostics is None else diagnostics_json(diagnostics))
+        )
+        if choose_encoding({'gzip'}):
+            response.response = gzip_stream(chunks)
+            response.headers['Content-Encoding'] = 'gzip'
+            response.set_etag(f'{key}-gzip')
+        else:
+            response.response = chunks
+            response.set_etag(key)
+        response.vary.add('Accept-Encoding')
+        return with_owner_token(response, key)
+
+    entry = build_entry(key, questions, test_name, duration, category, options, diagnostics)
+    quiz_cache.put(key, entry)
+    return with_owner_token(cached_quiz_response(key, entry), key)
+
+def cache_while_streaming(key, questions_count, chunks, diagnostics=None, lazy_chunks=None, offline=False):
+    # A streamed page is serialized piece by piece after the request has
+    # been logged, so the time spent producing pieces (not sending them) goes
+    # to the 'serialize' stage metric here rather than through timed_stage.
+    pieces = []
+    elapsed = 0.0
+    start = time.perf_counter()
+    for chunk in chunks:
+        elapsed += time.perf_counter() - start
+        pieces.append(chunk)
+        yield chunk
+        start = time.perf_counter()
+    elapsed += time.perf_counter() - start
+    metrics.observe('quiz_stage_seconds', elapsed, stage='serialize')
+    quiz_cache.put(key, new_entry(''.join(pieces), questions_count, diagnostics, lazy_chunks, offline))
+
+def quiz_headers(questions_count, diagnostics=None):
+    # The HTML response has no room for diagnostics, only their counts.
+    headers = {'X-Questions-Count': str(questions_count)}
+    if diagnostics is not None:
+        headers['X-Diagnostics-Errors'] = str(diagnostics['errorCount'])
+        headers['X-Diagnostics-Warnings'] = str(diagnostics['warningCount'])
+    return headers
+
+def cached_quiz_lookup(key):
+    # Answer for a quiz already rendered under key: 304 for a matching ETag,
+    # else the cached entry; None on a cache miss.
+    etag = matching_etag(key)
+    if etag:
+        metrics.inc('quiz_cache_lookups_total', result='not_modified')
+        return with_owner_token(not_modified(etag), key)
+
+    entry = quiz_cache.get(key)
+    if entry is None:
+        metrics.inc('quiz_cache_lookups_total', result='miss')
+        return None
+    metrics.inc('quiz_cache_lookups_total', result='hit')
+    return with_owner_token(cached_quiz_response(key, entry), key)
+
+def cached_quiz_response(key, entry):
+    encoded = entry.get('encoded', {})
+    if request.args.get('format') == 'html':
+        headers = quiz_headers(entry['questions_count'], entry.get('diagnostics'))
+        return negotiated_response(key, 'html', entry['html'], encoded, 'text/html', headers, cache_key=key)
+    with timed_stage('serialize'):
+        envelope = envelope_json(entry)
+    return negotiated_response(key, 'json', envelope, encoded, 'application/json', cache_key=key)
+
+# Requests slower than this are logged with their per-stage times; a
+# negative value turns the log off.
+SLOW_REQUEST_MS = float(os.environ.get('QUIZ_SLOW_REQUEST_MS', 1000))
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    # Streamed bodies are sent after this runs, so their time is not included.
+    elapsed = time.perf_counter() - g.request_start
+    endpoint = request.endpoint or 'unknown'
+    metrics.inc('quiz_requests_total', endpoint=endpoint, status=str(response.status_code))
+    metrics.observe('quiz_request_seconds', elapsed, endpoint=endpoint)
+    if request.content_length:
+        metrics.observe('quiz_request_bytes', request.content_length, endpoint=endpoint)
+    if 0 <= SLOW_REQUEST_MS <= elapsed * 1000:
+        stages = ', '.join(f'{stage} {seconds * 1000:.1f} ms' for stage, seconds in g.get('stage_seconds', {}).items())
+        app.logger.warning(
+            'Slow request: %s %s -> %d in %.1f ms (%s bytes; %s)', request.method, request.path,
+            response.status_code, elapsed * 1000, request.content_length or 0, stages or 'no stages'
+        )
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    # Prometheus text exposition, summed over every worker sharing
+    # QUIZ_METRICS_DIR.
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/')
 def index():
@@ -730,7 +3326,8 @@ def index():
 @app.route('/generate', methods=['POST'])
 def generate_quiz():
     try:
-        data = request.get_json()
+        with timed_stage('decode'):
+            data = request.get_json()
         txt_content = data.get('txtContent', '')
         test_name = data.get('testName', 'My Quiz Test')
         duration = data.get('duration', '60')
@@ -742,29 +3339,955 @@ def generate_quiz():
                 'error': 'कृपया प्रश्न डालें!'
             })
 
+        options = render_options()
+        hasher = quiz_cache_hasher(test_name, duration, category, options)
+        hasher.update(txt_content.encode('utf-8'))
+        key = hasher.hexdigest()
+
+        response = cached_quiz_lookup(key)
+        if response is not None:
+            return response
+
         # Parse questions from TXT
-        questions = converter.parse_txt_content(txt_content)
+        questions, diagnostics = parse_request_bank(io.StringIO(txt_content), options)
         
+        if not questions:
+            return no_questions_response(diagnostics)
+
+        # Generate HTML quiz
+        return quiz_response(key, questions, test_name, duration, category, options, diagnostics)
+        
+    except Exception as e:
+        metrics.inc('quiz_errors_total', type=type(e).__name__)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/validate', methods=['POST'])
+def validate_bank():
+    # Strict parse only, no render: every problem in the bank in one
+    # response. Takes the /generate JSON body or a raw text/plain body.
+    try:
+        if request.is_json:
+            stream = io.StringIO(request.get_json().get('txtContent', ''))
+        else:
+            stream = request.stream
+        questions, diagnostics = converter.parse_validated(stream)
+        result = {
+            'success': True,
+            'questionsCount': len(questions)
+        }
+        result.update(diagnostics_json(diagnostics))
+        return jsonify(result)
+
+    except Exception as e:
+        metrics.inc('quiz_errors_total', type=type(e).__name__)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/quizzes/<key>/chunks/<int:chunk>.json')
+def quiz_chunk(key, chunk):
+    # Chunks are content addressed and may be fetched by a downloaded page
+    # opened from anywhere, hence the long cache lifetime and open CORS.
+    found = quiz_cache.get_chunk(key, chunk)
+    if found is None:
+        return jsonify({
+            'success': False,
+            'error': 'प्रश्न नहीं मिले! टेस्ट दोबारा बनाएं।'
+        }), 404
+
+    body, encoded = found
+    response = negotiated_response(f'{key}-{chunk}', f'chunk{chunk}', body, encoded, 'application/json', cache_key=key)
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+# Pages are authored by whoever generated them (question text is HTML), so
+# a hosted page runs in an opaque origin, away from this host's storage and
+# service worker cache. Offline pages need the real origin for their service
+# worker and are served without it.
+QUIZ_PAGE_CSP = 'sandbox allow-scripts allow-forms allow-modals allow-popups allow-downloads'
+
+@app.route('/quizzes/<key>/')
+def quiz_page(key):
+    # A generated page served from this host, so an ?offline=1 page is
+    # within the service worker's /quizzes/ scope.
+    entry = quiz_cache.get(key)
+    if entry is None or 'html' not in entry:
+        return jsonify({
+            'success': False,
+            'error': 'टेस्ट नहीं मिला! टेस्ट दोबारा बनाएं।'
+        }), 404
+
+    etag = matching_etag(key)
+    if etag:
+        return not_modified(etag)
+    headers = quiz_headers(entry['questions_count'], entry.get('diagnostics'))
+    response = negotiated_response(key, 'html', entry['html'], entry.get('encoded', {}), 'text/html', headers, cache_key=key)
+    response.headers['Cache-Control'] = 'no-cache'
+    if not entry.get('offline'):
+        response.headers['Content-Security-Policy'] = QUIZ_PAGE_CSP
+    return response
+
+@app.route('/quizzes/sw.js')
+def quiz_service_worker():
+    # Revalidated on every load so a new runtime replaces the old cache.
+    response = Response(QUIZ_SW_JS, mimetype='application/javascript')
+    response.set_etag(QUIZ_ASSET_FINGERPRINT)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+# Most submissions one POST may carry.
+SUBMISSION_BATCH_LIMIT = int(os.environ.get('QUIZ_SUBMIT_MAX', 5000))
+
+def parse_submission(item, total, variants, variant=None, layouts=None):
+    # {'answers': [1-4 or null, ...], 'candidate', 'timeTaken', 'variant'} ->
+    # (candidate, given bytes, time_taken, variant); None if malformed.
+    # Answers to a variant (its seed comes from the item or the page's
+    # ?variant=, and must be one of the issued `variants`) are mapped back to
+    # base order; layouts memoizes variant_layout per seed for the caller.
+    if not isinstance(item, dict):
+        return None
+    variant = item.get('variant', variant)
+    if variant is not None and (not isinstance(variant, int) or isinstance(variant, bool) or variant not in variants):
+        return None
+    answers = item.get('answers')
+    if not isinstance(answers, list) or len(answers) > total:
+        return None
+    if any(isinstance(answer, bool) for answer in answers):
+        return None
+    try:
+        given = bytes([0 if answer is None else answer for answer in answers])
+    except (TypeError, ValueError):
+        return None
+    if given and (max(given) > 4 or given.count(0) != answers.count(None)):
+        return None
+    if variant is not None:
+        layouts = {} if layouts is None else layouts
+        if variant not in layouts:
+            layouts[variant] = variant_layout(total, variant)
+        given = base_answers(given, layouts[variant])
+    candidate = item.get('candidate')
+    time_taken = item.get('timeTaken')
+    return (
+        None if candidate is None else str(candidate)[:200],
+        given,
+        time_taken if isinstance(time_taken, int) and not isinstance(time_taken, bool) else None,
+        variant
+    )
+
+def quiz_owner_token(key):
+    return hmac.new(owner_secret, key.encode('utf-8'), hashlib.sha256).hexdigest()
+
+def with_owner_token(response, key):
+    # Whoever generates a ?submit=1 quiz gets the token that lists its
+    # submissions; it is a response header only, never part of the page.
+    if render_options().get('submit'):
+        response.headers['X-Quiz-Owner-Token'] = quiz_owner_token(key)
+        response.headers['Cache-Control'] = 'private, no-store'
+    return response
+
+def allow_cors(response):
+    # Downloaded quiz pages post from file:// or any other origin.
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
+    response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+    return response
+
+@app.route('/quizzes/<key>/submissions', methods=['POST', 'OPTIONS'])
+def submit_answers(key):
+    # One submission ({'answers': [...]}) or a bulk ingest
+    # ({'submissions': [{'answers': [...]}, ...]}) for a ?submit=1 quiz.
+    if request.method == 'OPTIONS':
+        return allow_cors(Response(status=204))
+
+    found = submission_store.get_answer_key(key)
+    if found is None:
+        return allow_cors(jsonify({
+            'success': False,
+            'error': 'टेस्ट नहीं मिला! टेस्ट दोबारा बनाएं।'
+        })), 404
+    answer_key, variants = found
+
+    data = request.get_json(silent=True)
+    bulk = isinstance(data, dict) and 'submissions' in data
+    items = data.get('submissions') if bulk else [data]
+    if not isinstance(items, list) or not items or len(items) > SUBMISSION_BATCH_LIMIT:
+        return allow_cors(jsonify({
+            'success': False,
+            'error': f'एक बार में 1 से {SUBMISSION_BATCH_LIMIT} उत्तर भेजें!'
+        })), 400
+
+    submissions = []
+    variant = request.args.get('variant', type=int)
+    layouts = {}
+    for n, item in enumerate(items):
+        submission = parse_submission(item, len(answer_key), variants, variant, layouts)
+        if submission is None:
+            return allow_cors(jsonify({
+                'success': False,
+                'error': f'अमान्य उत्तर (submission {n + 1})! हर उत्तर 1-4 या null होना चाहिए।'
+            })), 400
+        submissions.append(submission)
+
+    try:
+        results = submission_store.add(key, answer_key, submissions)
+    except sqlite3.Error:
+        return allow_cors(jsonify({
+            'success': False,
+            'error': 'उत्तर सेव नहीं हो सके! कृपया दोबारा भेजें।'
+        })), 503
+    if bulk:
+        return allow_cors(jsonify({'success': True, 'results': results}))
+    return allow_cors(jsonify({'success': True, 'result': results[0]}))
+
+def owner_forbidden(key):
+    # Results are only for the quiz owner, who sends the token from
+    # X-Quiz-Owner-Token (see with_owner_token) in the same header. The page
+    # and its submit URL are not enough, and the routes that check this send
+    # no CORS headers, so another site cannot read them with a visitor's
+    # token. Returns the 403 response, or None for the owner.
+    token = request.headers.get('X-Quiz-Owner-Token', '')
+    if hmac.compare_digest(token, quiz_owner_token(key)):
+        return None
+    return jsonify({
+        'success': False,
+        'error': 'यह जानकारी केवल टेस्ट बनाने वाले के लिए है!'
+    }), 403
+
+@app.route('/quizzes/<key>/submissions', methods=['GET'])
+def list_submissions(key):
+    # Candidates' names and scores, for the owner only.
+    forbidden = owner_forbidden(key)
+    if forbidden is not None:
+        return forbidden
+
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    total, submissions = submission_store.page(key, limit, offset)
+    return jsonify({'success': True, 'total': total, 'submissions': submissions})
+
+@app.route('/quizzes/<key>/analytics')
+def quiz_analytics(key):
+    # Per-question stats from the rollups, for the owner only; ?format=csv
+    # downloads them.
+    forbidden = owner_forbidden(key)
+    if forbidden is not None:
+        return forbidden
+    found = submission_store.get_answer_key(key)
+    if found is None:
+        return jsonify({
+            'success': False,
+            'error': 'टेस्ट नहीं मिला! टेस्ट दोबारा बनाएं।'
+        }), 404
+    answer_key = found[0]
+
+    summary, questions = submission_store.analytics(key, answer_key)
+    if request.args.get('format') != 'csv':
+        return jsonify(dict(summary, success=True, questions=questions))
+
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow([
+        'question', 'correct_option', 'attempts', 'correct', 'percent_correct',
+        'skipped', 'skip_rate', 'option_1', 'option_2', 'option_3', 'option_4'
+    ])
+    for q in questions:
+        writer.writerow([
+            q['question'], q['correctOption'] or '', q['attempts'], q['correct'], f"{q['percentCorrect']:.2f}",
+            q['skipped'], f"{q['skipRate']:.2f}", *q['options']
+        ])
+    return Response(
+        output.getvalue(),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename=analytics-{key[:12]}.csv'}
+    )
+
+@app.route('/static/quiz/<name>')
+def quiz_asset(name):
+    # Fingerprinted shared stylesheet/script for ?assets=external pages; the
+    # name changes whenever the content does, so cache it for a year.
+    if name not in QUIZ_ASSETS:
+        return jsonify({
+            'success': False,
+            'error': 'फाइल नहीं मिली!'
+        }), 404
+
+    mimetype, body = QUIZ_ASSETS[name]
+    response = negotiated_response(QUIZ_ASSET_FINGERPRINT, 'asset', body, QUIZ_ASSET_ENCODED[name], mimetype)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
+
+@app.route('/cache/stats')
+def cache_stats():
+    return jsonify(quiz_cache.stats())
+
+@app.route('/generate/upload', methods=['POST'])
+def generate_quiz_upload():
+    # Accepts the TXT bank as a raw text/plain body or as a multipart file
+    # ("file" field) and streams it straight into the parser. Settings come
+    # from query string or form fields.
+    try:
+        if request.mimetype == 'multipart/form-data':
+            upload = request.files.get('file')
+            if upload is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'कृपया TXT फाइल अपलोड करें!'
+                })
+            stream = upload.stream
+            settings = request.values
+        else:
+            stream = request.stream
+            settings = request.args
+
+        test_name = settings.get('testName', 'My Quiz Test')
+        duration = settings.get('duration', '60')
+        category = settings.get('category', 'General Knowledge')
+
+        # The body has to be read to know its key, so hash it while parsing
+        # and only skip the render on a hit.
+        options = render_options()
+        hasher = quiz_cache_hasher(test_name, duration, category, options)
+        questions, diagnostics = parse_request_bank(HashingReader(stream, hasher), options)
+        key = hasher.hexdigest()
+
+        if not questions:
+            return no_questions_response(diagnostics)
+
+        response = cached_quiz_lookup(key)
+        if response is not None:
+            return response
+
+        return quiz_response(key, questions, test_name, duration, category, options, diagnostics)
+
+    except Exception as e:
+        metrics.inc('quiz_errors_total', type=type(e).__name__)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    # Accepts the same JSON body as /generate, or a raw text/plain body with
+    # settings in the query string like /generate/upload. The input is
+    # spooled to a temporary file so the worker thread can read it after
+    # this request has finished.
+    try:
+        if request.is_json:
+            data = request.get_json()
+            txt_content = data.get('txtContent', '')
+            settings = data
+            body = io.BytesIO(txt_content.encode('utf-8'))
+        else:
+            body = request.stream
+            settings = request.args
+
+        test_name = settings.get('testName', 'My Quiz Test')
+        duration = settings.get('duration', '60')
+        category = settings.get('category', 'General Knowledge')
+
+        options = render_options()
+        hasher = quiz_cache_hasher(test_name, duration, category, options)
+        source = tempfile.SpooledTemporaryFile(max_size=JOB_SYNC_BYTES)
+        for line in HashingReader(body, hasher):
+            source.write(line)
+        size = source.tell()
+        source.seek(0)
+
+        if not size:
+            source.close()
+            return jsonify({
+                'success': False,
+                'error': 'कृपया प्रश्न डालें!'
+            })
+
+        key = hasher.hexdigest()
+        job = job_manager.create(key, (test_name, duration, category), options)
+        entry = quiz_cache.get(key)
+        if entry is not None:
+            source.close()
+            job_manager.finish_cached(job, entry)
+        elif size < JOB_SYNC_BYTES:
+            job_manager.run(job, source)
+        else:
+            job_manager.submit(job, source)
+
+        status = job.to_dict()
+        status.update({
+            'success': job.status != 'error',
+            'statusUrl': url_for('job_status', job_id=job.id),
+            'downloadUrl': url_for('job_download', job_id=job.id)
+        })
+        return with_owner_token(jsonify(status), key), 200 if job.status in ('done', 'error') else 202
+
+    except Exception as e:
+        metrics.inc('quiz_errors_total', type=type(e).__name__)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'जॉब नहीं मिला!'
+        }), 404
+
+    status = job.to_dict()
+    status.update({
+        'success': job.status != 'error',
+        'downloadUrl': url_for('job_download', job_id=job.id)
+    })
+    return jsonify(status)
+
+@app.route('/jobs/<job_id>/download')
+def job_download(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'जॉब नहीं मिला!'
+        }), 404
+    if job.status != 'done':
+        return jsonify({
+            'success': False,
+            'error': job.error or 'टेस्ट अभी तैयार नहीं है।',
+            'status': job.status
+        }), 409
+
+    etag = matching_etag(job.key)
+    if etag:
+        return not_modified(etag)
+
+    entry = quiz_cache.get(job.key)
+    if entry is None:
+        return jsonify({
+            'success': False,
+            'error': 'टेस्ट कैश से हट गया है! टेस्ट दोबारा बनाएं।',
+            'status': job.status
+        }), 410
+
+    test_name = job.settings[0]
+    return negotiated_response(
+        job.key, 'html', entry['html'], entry.get('encoded', {}), 'text/html',
+        headers={
+            'X-Questions-Count': str(entry['questions_count']),
+            'Content-Disposition': f"attachment; filename*=UTF-8''{quote(str(test_name).replace(' ', '_'))}_quiz.html"
+        },
+        cache_key=job.key
+    )
+
+@app.route('/batch', methods=['POST'])
+def batch_convert():
+    # Converts many banks in one request: multipart "files" (each a .txt, or
+    # a .zip of .txt files) or a raw application/zip body. Duration and
+    # category are shared; each quiz is named after its file. The response
+    # is a zip streamed as the quizzes finish, with a manifest.json listing
+    # per-file question counts and errors.
+    try:
+        banks = []
+        if request.mimetype == 'multipart/form-data':
+            for upload in request.files.getlist('files'):
+                if upload.filename.lower().endswith('.zip'):
+                    used = sum(len(data) for _, data in banks)
+                    banks.extend(iter_zip_archive(upload.stream, ZIP_TOTAL_MAX_BYTES - used))
+                else:
+                    banks.append((upload.filename, upload.read()))
+        elif request.mimetype in ('application/zip', 'application/x-zip-compressed'):
+            banks.extend(iter_zip_archive(io.BytesIO(request.get_data())))
+        check_bank_names(banks)
+
+        if not banks:
+            return jsonify({
+                'success': False,
+                'error': 'कृपया TXT या ZIP फाइलें अपलोड करें!'
+            })
+
+        duration = request.values.get('duration', '60')
+        category = request.values.get('category', 'General Knowledge')
+        chunk_size = None
+        if request.values.get('lazy') in ('1', 'true'):
+            chunk_size = max(1, int(request.values.get('chunkSize', LAZY_CHUNK_SIZE)))
+        asset_url = None
+        extra_files = []
+        if request.values.get('assets') == 'external':
+            asset_url = ''
+            extra_files = asset_files()
+        sw_url = None
+        if request.values.get('offline') in ('1', 'true'):
+            sw_url = QUIZ_SW_NAME
+            extra_files.append(service_worker_file())
+
+        return Response(
+            iter_batch_zip(iter_batch(banks, duration, category, chunk_size, asset_url, sw_url=sw_url), extra_files),
+            mimetype='application/zip',
+            headers={'Content-Disposition': 'attachment; filename=quizzes.zip'}
+        )
+
+    except Exception as e:
+        metrics.inc('quiz_errors_total', type=type(e).__name__)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+# Most variants one /variants request may ask for.
+VARIANT_LIMIT = int(os.environ.get('QUIZ_VARIANT_MAX', 1000))
+
+@app.route('/variants', methods=['POST'])
+def generate_variants():
+    # Parses the TXT once and returns a zip of `count` shuffled variants,
+    # variant-<seed>.html, plus variants.json mapping files to seeds. Seeds
+    # run from `seed` (random if not given). With ?submit=1 every variant
+    # posts to the same submissions URL with its seed, and is scored against
+    # the one stored answer key.
+    try:
+        data = request.get_json()
+        txt_content = data.get('txtContent', '')
+        test_name = data.get('testName', 'My Quiz Test')
+        duration = data.get('duration', '60')
+        category = data.get('category', 'General Knowledge')
+        count = int(data.get('count', 1))
+        base_seed = data.get('seed')
+        base_seed = random.randrange(1 << 31) if base_seed is None else int(base_seed)
+
+        if not txt_content.strip():
+            return jsonify({
+                'success': False,
+                'error': 'कृपया प्रश्न डालें!'
+            })
+        if not 1 <= count <= VARIANT_LIMIT or base_seed < 0:
+            return jsonify({
+                'success': False,
+                'error': f'Variants की संख्या 1 से {VARIANT_LIMIT} के बीच होनी चाहिए!'
+            })
+
+        questions = converter.parse_table(io.StringIO(txt_content))
         if not questions:
             return jsonify({
                 'success': False,
                 'error': 'कोई वैध प्रश्न नहीं मिले! कृपया फॉर्मेट चेक करें।'
             })
 
-        # Generate HTML quiz
-        html_output = converter.generate_html(questions, test_name, duration, category)
-        
+        # Variants embed every question, so ?lazy does not apply.
+        options = render_options()
+        options.pop('lazy', None)
+        options.pop('chunkSize', None)
+        hasher = quiz_cache_hasher(test_name, duration, category, options)
+        hasher.update(txt_content.encode('utf-8'))
+        key = hasher.hexdigest()
+        kwargs = render_kwargs(key, options)
+        seeds = range(base_seed, base_seed + count)
+        store_answer_key(key, questions, kwargs, seeds)
+        extra_files = []
+        if 'asset_url' in kwargs:
+            kwargs['asset_url'] = ''
+            extra_files = asset_files()
+        if 'sw_url' in kwargs:
+            kwargs['sw_url'] = QUIZ_SW_NAME
+            extra_files.append(service_worker_file())
+
+        extra_files.append(('variants.json', json.dumps(
+            [{'file': f'variant-{seed}.html', 'variant': seed} for seed in seeds], indent=2
+        )))
+        variants = converter.iter_variants(
+            questions, test_name, duration, category, seeds,
+            kwargs.get('asset_url'), kwargs.get('submit_url'), kwargs.get('sw_url')
+        )
+        results = (
+            (f'variant-{seed}.html', [(f'variant-{seed}.html', html.encode('utf-8'))], len(questions), None)
+            for seed, html in variants
+        )
+        return with_owner_token(Response(
+            iter_batch_zip(results, extra_files),
+            mimetype='application/zip',
+            headers={'Content-Disposition': 'attachment; filename=variants.zip'}
+        ), key)
+
+    except Exception as e:
+        metrics.inc('quiz_errors_total', type=type(e).__name__)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/bank/import', methods=['POST'])
+def bank_import():
+    # Parses TXT once and adds its questions to the question bank.
+    try:
+        data = request.get_json()
+        txt_content = data.get('txtContent', '')
+        category = data.get('category', 'General Knowledge')
+
+        if not txt_content.strip():
+            return jsonify({
+                'success': False,
+                'error': 'कृपया प्रश्न डालें!'
+            })
+
+        questions = converter.parse_table(io.StringIO(txt_content))
+        if not questions:
+            return jsonify({
+                'success': False,
+                'error': 'कोई वैध प्रश्न नहीं मिले! कृपया फॉर्मेट चेक करें।'
+            })
+
+        added, duplicates = question_bank.import_questions(questions, category)
         return jsonify({
             'success': True,
-            'html': html_output,
-            'questionsCount': len(questions)
+            'category': category,
+            'added': added,
+            'duplicates': duplicates
         })
-        
+
     except Exception as e:
+        metrics.inc('quiz_errors_total', type=type(e).__name__)
         return jsonify({
             'success': False,
             'error': str(e)
         })
 
+@app.route('/bank/categories')
+def bank_categories():
+    total, categories = question_bank.categories()
+    return jsonify({'success': True, 'total': total, 'categories': categories})
+
+@app.route('/bank/assemble', methods=['POST'])
+def bank_assemble():
+    # Builds a quiz from bank questions picked by category and/or keyword,
+    # optionally as a random sample, and renders it like /generate (same
+    # query options, cache and response formats).
+    try:
+        data = request.get_json()
+        category = data.get('category') or None
+        keyword = (data.get('keyword') or '').strip() or None
+        count = data.get('count')
+        test_name = data.get('testName', category or 'My Quiz Test')
+        duration = data.get('duration', '60')
+
+        ids = question_bank.select(
+            category, keyword,
+            count=None if count is None else max(1, int(count)),
+            sample=bool(data.get('random')),
+            seed=data.get('seed')
+        )
+        if not ids:
+            return jsonify({
+                'success': False,
+                'error': 'बैंक में ऐसे कोई प्रश्न नहीं मिले!'
+            })
+
+        # Bank rows never change, so the chosen ids identify the content.
+        options = render_options()
+        hasher = quiz_cache_hasher(test_name, duration, category or 'General Knowledge', options)
+        hasher.update(b'bank:' + array('q', ids).tobytes())
+        key = hasher.hexdigest()
+
+        response = cached_quiz_lookup(key)
+        if response is not None:
+            return response
+
+        questions = question_bank.load(ids)
+        return quiz_response(key, questions, test_name, duration, category or 'General Knowledge', options)
+
+    except Exception as e:
+        metrics.inc('quiz_errors_total', type=type(e).__name__)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+def write_output_files(output, files, gzip_output=False):
+    # Writes (relative path, bytes) pairs under output, with a precompressed
+    # .gz next to each one if asked.
+    for path, data in files:
+        path = os.path.join(output, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        if gzip_output:
+            with open(path + '.gz', 'wb') as f:
+                f.write(gzip.compress(data, GZIP_LEVEL, mtime=0))
+
+@app.cli.command('convert-dir')
+@click.argument('source_dir', type=click.Path(exists=True, file_okay=False))
+@click.argument('output', type=click.Path())
+@click.option('--duration', default='60', help='Test duration in minutes.')
+@click.option('--category', default='General Knowledge', help='Category shown on every quiz.')
+@click.option('--workers', type=int, default=None, help='Process pool size (default: usable CPUs).')
+@click.option('--lazy', is_flag=True, help='Embed only the first chunk; write the rest as sidecar JSON files.')
+@click.option('--chunk-size', type=int, default=LAZY_CHUNK_SIZE, help='Questions per lazily loaded chunk.')
+@click.option('--gzip', 'gzip_output', is_flag=True, help='Also write a precompressed .gz next to every file (directory output only).')
+@click.option('--external-assets', is_flag=True, help='Write the shared stylesheet and script once and link them from every page.')
+@click.option('--offline', is_flag=True, help='Make pages work offline once opened over http(s); writes quiz-sw.js.')
+def convert_dir_command(source_dir, output, duration, category, workers, lazy, chunk_size, gzip_output, external_assets, offline):
+    """Convert every .txt bank in SOURCE_DIR to HTML.
+
+    OUTPUT is a directory, or a .zip file to write a single archive. Exits
+    with status 1 if any bank could not be converted.
+    """
+    to_zip = output.lower().endswith('.zip')
+    if to_zip and gzip_output:
+        raise click.UsageError('--gzip only applies to directory output; a .zip archive is already compressed.')
+    names = sorted(name for name in os.listdir(source_dir) if name.lower().endswith('.txt'))
+    banks = []
+    for name in names:
+        with open(os.path.join(source_dir, name), 'rb') as f:
+            banks.append((name, f.read()))
+
+    failed = 0
+    extra_files = asset_files() if external_assets else []
+    if offline:
+        extra_files.append(service_worker_file())
+    with process_pool(workers) as pool:
+        results = iter_batch(
+            banks, duration, category, chunk_size if lazy else None, '' if external_assets else None,
+            pool=pool, sw_url=QUIZ_SW_NAME if offline else None
+        )
+        if to_zip:
+            def counted(results):
+                # Failed banks are listed in the archive's manifest.json and
+                # also reported here.
+                nonlocal failed
+                for result in results:
+                    html_name, _, _, error = result
+                    if error:
+                        failed += 1
+                        click.echo(f'{html_name}: {error}', err=True)
+                    yield result
+
+            with open(output, 'wb') as f:
+                for chunk in iter_batch_zip(counted(results), extra_files):
+                    f.write(chunk)
+            click.echo(f'{len(banks) - failed} of {len(banks)} banks -> {output}')
+        else:
+            write_output_files(output, extra_files, gzip_output)
+            for html_name, files, questions_count, error in results:
+                if error:
+                    failed += 1
+                    click.echo(f'{html_name}: {error}', err=True)
+                    continue
+                write_output_files(output, files, gzip_output)
+                click.echo(f'{html_name}: {questions_count} questions')
+
+    if failed:
+        raise SystemExit(1)
+
+# Pages and their sidecar files go under this directory of an exported
+# site; index.html and catalog.json sit at the top.
+SITE_QUIZ_DIR = 'quizzes'
+
+SITE_INDEX_TEMPLATE = '''<!DOCTYPE html>
+<html lang="hi">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{{title}}</title>
+    <style>
+        body { margin: 0; padding: 24px; font-family: system-ui, -apple-system, "Segoe UI", Roboto, "Noto Sans Devanagari", sans-serif; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); min-height: 100vh; }
+        .container { max-width: 900px; margin: 0 auto; background: #fff; border-radius: 16px; padding: 24px; box-shadow: 0 10px 30px rgba(0, 0, 0, 0.2); }
+        h1 { margin-top: 0; color: #333; }
+        h2 { color: #667eea; border-bottom: 2px solid #eee; padding-bottom: 6px; }
+        ul { list-style: none; padding: 0; }
+        li { display: flex; justify-content: space-between; gap: 12px; padding: 10px 0; border-bottom: 1px solid #f0f0f0; }
+        a { color: #333; font-weight: 600; text-decoration: none; }
+        a:hover { color: #667eea; }
+        .meta { color: #777; white-space: nowrap; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>{{title}}</h1>
+{{sections}}
+    </div>
+</body>
+</html>
+'''
+
+def load_site_manifest(path):
+    # JSON list (or {"quizzes": [...]}) of {"file", "name", "duration",
+    # "category"}; only "file" is required. Returns {file: entry}.
+    with open(path, encoding='utf-8') as f:
+        entries = json.load(f)
+    if isinstance(entries, dict):
+        entries = entries.get('quizzes', [])
+    manifest = {}
+    for entry in entries:
+        if not isinstance(entry, dict) or not isinstance(entry.get('file'), str):
+            raise click.ClickException(f'{path}: every entry needs a "file"')
+        manifest[entry['file']] = entry
+    return manifest
+
+def render_site_index(title, quizzes):
+    # quizzes: catalog entries, listed by category and then name.
+    by_category = {}
+    for quiz in sorted(quizzes, key=lambda quiz: (quiz['category'], quiz['name'])):
+        by_category.setdefault(quiz['category'], []).append(
+            f'            <li><a href="{escape_html(quote(quiz["page"]))}">{escape_html(quiz["name"])}</a>'
+            f'<span class="meta">{quiz["questionsCount"]} प्रश्न · {escape_html(quiz["duration"])} मिनट</span></li>'
+        )
+    sections = ''.join(
+        f'        <h2>{escape_html(category)}</h2>\n        <ul>\n' + '\n'.join(items) + '\n        </ul>\n'
+        for category, items in by_category.items()
+    )
+    return SITE_INDEX_TEMPLATE.replace('{{title}}', escape_html(title)).replace('{{sections}}\n', sections)
+
+def output_paths(files, gzip_output):
+    # Paths write_output_files creates for files.
+    paths = [path for path, _ in files]
+    if gzip_output:
+        paths += [path + '.gz' for path in paths]
+    return sorted(paths)
+
+def remove_output_files(output, paths):
+    # Removes paths under output, then any directory they leave empty.
+    directories = set()
+    for path in paths:
+        try:
+            os.remove(os.path.join(output, path))
+        except FileNotFoundError:
+            pass
+        directories.add(os.path.dirname(path))
+    for directory in sorted(directories, key=len, reverse=True):
+        if directory:
+            try:
+                os.rmdir(os.path.join(output, directory))
+            except OSError:
+                pass
+
+def write_if_changed(output, path, data, gzip_output=False):
+    # Leaves an unchanged file alone, so static servers keep its mtime/ETag.
+    target = os.path.join(output, path)
+    try:
+        with open(target, 'rb') as f:
+            unchanged = f.read() == data
+    except FileNotFoundError:
+        unchanged = False
+    if not unchanged or (gzip_output and not os.path.exists(target + '.gz')):
+        write_output_files(output, [(path, data)], gzip_output)
+
+@app.cli.command('export-site')
+@click.argument('source_dir', type=click.Path(exists=True, file_okay=False))
+@click.argument('output', type=click.Path(file_okay=False))
+@click.option('--manifest', 'manifest_path', type=click.Path(exists=True, dir_okay=False),
+              help='Quiz metadata JSON (default: SOURCE_DIR/manifest.json if present).')
+@click.option('--title', default='Quiz Catalog', help='Heading of the index page.')
+@click.option('--duration', default='60', help='Duration of quizzes the manifest gives none for.')
+@click.option('--category', default='General Knowledge', help='Category of quizzes the manifest gives none for.')
+@click.option('--workers', type=int, default=None, help='Process pool size (default: usable CPUs).')
+@click.option('--lazy', is_flag=True, help='Embed only the first chunk; write the rest as sidecar JSON files.')
+@click.option('--chunk-size', type=int, default=LAZY_CHUNK_SIZE, help='Questions per lazily loaded chunk.')
+@click.option('--gzip', 'gzip_output', is_flag=True, help='Also write a precompressed .gz next to every file.')
+@click.option('--external-assets', is_flag=True, help='Write the shared stylesheet and script once and link them from every page.')
+@click.option('--offline', is_flag=True, help='Make pages work offline once opened over http(s); writes quiz-sw.js.')
+@click.option('--force', is_flag=True, help='Rebuild every quiz, changed or not.')
+def export_site_command(source_dir, output, manifest_path, title, duration, category, workers, lazy, chunk_size,
+                        gzip_output, external_assets, offline, force):
+    """Export every .txt bank in SOURCE_DIR as a static site in OUTPUT.
+
+    Each quiz becomes quizzes/<file>.html, listed by category on
+    index.html; catalog.json describes the site. A quiz is only rebuilt
+    when its TXT, its manifest entry, the export options or the page
+    template changed since the last export. The result needs nothing but
+    a static file server.
+    """
+    if manifest_path is None and os.path.exists(os.path.join(source_dir, 'manifest.json')):
+        manifest_path = os.path.join(source_dir, 'manifest.json')
+    manifest = load_site_manifest(manifest_path) if manifest_path else {}
+    names = sorted(name for name in os.listdir(source_dir) if name.lower().endswith('.txt'))
+    missing = sorted(set(manifest) - set(names))
+    if missing:
+        raise click.ClickException(f'Listed in the manifest but not in {source_dir}: {", ".join(missing)}')
+
+    catalog_path = os.path.join(output, 'catalog.json')
+    previous = {}
+    if os.path.exists(catalog_path):
+        with open(catalog_path, encoding='utf-8') as f:
+            previous = json.load(f)
+    built = {quiz['file']: quiz for quiz in previous.get('quizzes', [])}
+
+    options = {'lazy': chunk_size if lazy else None, 'externalAssets': external_assets, 'offline': offline, 'gzip': gzip_output}
+    shared_files = (asset_files() if external_assets else []) + ([service_worker_file()] if offline else [])
+    shared_files = [(f'{SITE_QUIZ_DIR}/{path}', data) for path, data in shared_files]
+
+    quizzes = {}
+    pending = []
+    for name in names:
+        entry = manifest.get(name, {})
+        quiz = {
+            'file': name,
+            'name': str(entry.get('name') or os.path.splitext(name)[0]),
+            'duration': str(entry.get('duration', duration)),
+            'category': str(entry.get('category', category))
+        }
+        with open(os.path.join(source_dir, name), 'rb') as f:
+            data = f.read()
+        hasher = quiz_cache_hasher(quiz['name'], quiz['duration'], quiz['category'], options)
+        hasher.update(data)
+        quiz['hash'] = hasher.hexdigest()
+        old = built.get(name)
+        if not force and old is not None and old['hash'] == quiz['hash'] and all(
+            os.path.exists(os.path.join(output, path)) for path in old['files']
+        ):
+            quizzes[name] = old
+        else:
+            pending.append((quiz, data))
+
+    failed = 0
+    with process_pool(workers) as pool:
+        futures = {
+            pool.submit(
+                convert_bank, quiz['file'], data, quiz['duration'], quiz['category'], chunk_size if lazy else None,
+                '' if external_assets else None, QUIZ_SW_NAME if offline else None, quiz['name']
+            ): quiz
+            for quiz, data in pending
+        }
+        for future in as_completed(futures):
+            quiz = futures[future]
+            html_name, files, questions_count, error = future.result()
+            if error:
+                # The last good build of this quiz, if any, stays published.
+                failed += 1
+                click.echo(f'{quiz["file"]}: {error}', err=True)
+                if quiz['file'] in built:
+                    quizzes[quiz['file']] = built[quiz['file']]
+                continue
+            files = [(f'{SITE_QUIZ_DIR}/{path}', data) for path, data in files]
+            write_output_files(output, files, gzip_output)
+            quiz['page'] = f'{SITE_QUIZ_DIR}/{html_name}'
+            quiz['questionsCount'] = questions_count
+            quiz['files'] = output_paths(files, gzip_output)
+            old = built.get(quiz['file'])
+            if old is not None:
+                remove_output_files(output, set(old['files']) - set(quiz['files']))
+            quizzes[quiz['file']] = quiz
+            click.echo(f'{quiz["file"]}: {questions_count} questions')
+
+    for name in set(built) - set(quizzes):
+        remove_output_files(output, built[name]['files'])
+        click.echo(f'{name}: removed')
+    catalog = {
+        'title': title,
+        'shared': output_paths(shared_files + [('index.html', None)], gzip_output),
+        'quizzes': [quizzes[name] for name in sorted(quizzes)]
+    }
+    shared_files.append(('index.html', render_site_index(title, catalog['quizzes']).encode('utf-8')))
+    for path, data in shared_files:
+        write_if_changed(output, path, data, gzip_output)
+    remove_output_files(output, set(previous.get('shared', [])) - set(catalog['shared']))
+    write_if_changed(output, 'catalog.json', json.dumps(catalog, ensure_ascii=False, indent=2).encode('utf-8'))
+    click.echo(f'{len(pending) - failed} built, {len(names) - len(pending)} unchanged -> {output}')
+    if failed:
+        raise SystemExit(1)
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,402 @@
+"""Benchmarks for the quiz converter.
+
+Usage:
+    python bench.py render [--sizes 10,1000,100000] [--repeat 5]
+    python bench.py variants [--size 1000] [--count 500]
+    python bench.py parse [--size 200000] [--workers 1,2,4,8] [--repeat 3]
+    python bench.py serialize [--sizes 1000,100000] [--languages hi,en] [--repeat 3]
+    python bench.py suite [--sizes 10,1000,100000] [--languages hi,en] [--output suite.json]
+    python bench.py load [--requests 500] [--distinct 50] [--url http://127.0.0.1:8000] [--output load.json]
+    python bench.py compare OLD.json NEW.json
+
+suite and load write JSON (to stdout unless --output is given), and
+compare prints the change of every timing between two such files, e.g.
+the same run on two commits. Synthetic banks are generated from a fixed
+seed, so the input is the same on every run.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import app as quiz_app
+from app import NO_SOLUTION, QuestionTable, QuizConverter, app, escape_script_json, parse_parallel
+
+WORDS = {
+    'hi': (
+        'भारत राजधानी नदी पर्वत राज्य संविधान अनुच्छेद संसद राष्ट्रपति प्रधानमंत्री '
+        'वर्ष युद्ध साम्राज्य वंश शासक किला मंदिर भाषा लिपि ग्रंथ कवि लेखक पुरस्कार '
+        'खेल ओलंपिक विज्ञान ऊर्जा प्रकाश ध्वनि तत्व यौगिक कोशिका रक्त हृदय फसल मिट्टी '
+        'जलवायु वर्षा मानसून वन पशु पक्षी सबसे बड़ा छोटा पहला प्रमुख कौन सा किस कितने'
+    ).split(),
+    'en': (
+        'India capital river mountain state constitution article parliament president '
+        'minister year battle empire dynasty ruler fort temple language script book poet '
+        'author award sport olympic science energy light sound element compound cell blood '
+        'heart crop soil climate rainfall monsoon forest animal bird largest smallest first '
+        'main which who how many'
+    ).split()
+}
+QUESTION_LABEL = {'hi': 'प्रश्न', 'en': 'Question'}
+
+
+def make_questions(count, language='hi', seed=0):
+    # Questions of varied length; about one in ten has no solution (the TXT
+    # leaves the line out, so it parses to NO_SOLUTION).
+    rng = random.Random(seed)
+    words = WORDS[language]
+    questions = []
+    for i in range(1, count + 1):
+        question = {
+            'id': i,
+            'text': f'{QUESTION_LABEL[language]} {i}: ' + ' '.join(rng.choices(words, k=rng.randint(6, 30))) + '?',
+            'options': [' '.join(rng.choices(words, k=rng.randint(1, 4))) for _ in range(4)],
+            'correct_option': str(rng.randint(1, 4)),
+            'solution': NO_SOLUTION
+        }
+        if rng.random() >= 0.1:
+            question['solution'] = ' '.join(rng.choices(words, k=rng.randint(5, 40)))
+        questions.append(question)
+    return questions
+
+
+def make_txt(count, language='hi', seed=0):
+    blocks = []
+    for question in make_questions(count, language, seed):
+        lines = [str(question['id']), question['text'], *question['options'], question['correct_option']]
+        if question['solution'] != NO_SOLUTION:
+            lines.append(question['solution'])
+        blocks.append('\n'.join(lines))
+    return '\n---\n'.join(blocks).encode('utf-8')
+
+
+def best_of(repeat, func, *args):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory(func, *args):
+    # Peak bytes allocated by Python while func runs, and its result.
+    tracemalloc.start()
+    try:
+        result = func(*args)
+        return tracemalloc.get_traced_memory()[1], result
+    finally:
+        tracemalloc.stop()
+
+
+def run_info(args):
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    settings = {k: v for k, v in vars(args).items() if k not in ('func', 'output')}
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': quiz_app.usable_cpus(),
+        'args': settings
+    }
+
+
+def write_json(result, output):
+    text = json.dumps(result, ensure_ascii=False, indent=2, sort_keys=True)
+    if output in (None, '-'):
+        print(text)
+    else:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        print(f'results -> {output}', file=sys.stderr)
+
+
+def bench_render(args):
+    converter = QuizConverter()
+    print(f'{"questions":>10}  {"render ms":>10}  {"output KB":>10}')
+    for size in args.sizes:
+        questions = make_questions(size)
+        seconds = best_of(args.repeat, converter.generate_html, questions, 'Bench', '60', 'GK')
+        output = converter.generate_html(questions, 'Bench', '60', 'GK')
+        print(f'{size:>10}  {seconds * 1000:>10.3f}  {len(output.encode("utf-8")) / 1024:>10.1f}')
+
+
+def bench_variants(args):
+    converter = QuizConverter()
+    questions = QuestionTable.from_questions(make_questions(args.size))
+    single = best_of(3, converter.generate_html, questions, 'Bench', '60', 'GK')
+    start = time.perf_counter()
+    for _ in converter.iter_variants(questions, 'Bench', '60', 'GK', range(args.count)):
+        pass
+    total = time.perf_counter() - start
+    print(f'{args.size} questions: one render {single * 1000:.2f} ms, '
+          f'{args.count} variants {total * 1000:.1f} ms ({total / args.count * 1000:.2f} ms each)')
+
+
+def bench_parse(args):
+    converter = QuizConverter()
+    data = make_txt(args.size)
+    print(f'{args.size} questions, {len(data) / 1024 / 1024:.1f} MB, {quiz_app.usable_cpus()} usable CPUs')
+    sequential = best_of(args.repeat, lambda: converter.parse_table(io.BytesIO(data)))
+    print(f'{"workers":>8}  {"parse ms":>10}  {"speedup":>8}')
+    print(f'{"serial":>8}  {sequential * 1000:>10.1f}  {1:>8.2f}')
+    for workers in args.workers:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(abs, range(workers)))  # start the workers first
+            seconds = best_of(args.repeat, parse_parallel, data, pool)
+        print(f'{workers:>8}  {seconds * 1000:>10.1f}  {sequential / seconds:>8.2f}')
+
+
+def bench_serialize(args):
+    # The questions JSON embedded in a page and the JSON envelope around a
+    # page: plain stdlib json.dumps (the old path, without script escaping)
+    # against the stdlib with escape_script_json and, if installed, orjson.
+    converter = QuizConverter()
+    stdlib = lambda value: json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+    embedded = [('json.dumps', stdlib), ('json.dumps+escape', lambda value: escape_script_json(stdlib(value)))]
+    envelopes = [('json.dumps', stdlib)]
+    if quiz_app.orjson is not None:
+        fast = lambda value: quiz_app.orjson.dumps(value).decode('utf-8')
+        embedded.append(('orjson+escape', lambda value: escape_script_json(fast(value))))
+        envelopes.append(('orjson', fast))
+    else:
+        print('orjson is not installed', file=sys.stderr)
+    print(f'{"lang":>4}  {"questions":>9}  {"payload":<9}  {"backend":<18}  {"ms":>9}  {"MB":>7}')
+    for language in args.languages:
+        for size in args.sizes:
+            questions = converter.parse_table(io.BytesIO(make_txt(size, language, seed=size)))
+            envelope = {'success': True, 'html': converter.generate_html(questions, 'Bench', '60', 'GK'), 'questionsCount': size}
+            for payload, value, backends in (('questions', questions.columns(), embedded), ('envelope', envelope, envelopes)):
+                for name, dumps in backends:
+                    seconds = best_of(args.repeat, dumps, value)
+                    megabytes = len(dumps(value).encode('utf-8')) / 1024 / 1024
+                    print(f'{language:>4}  {size:>9}  {payload:<9}  {name:<18}  {seconds * 1000:>9.2f}  {megabytes:>7.1f}')
+
+
+PARSERS = {
+    'parse_txt_content': lambda converter, data: converter.parse_txt_content(data.decode('utf-8')),
+    'parse_stream': lambda converter, data: converter.parse_stream(io.BytesIO(data)),
+    'parse_table': lambda converter, data: converter.parse_table(io.BytesIO(data)),
+    'parse_validated': lambda converter, data: converter.parse_validated(io.BytesIO(data))[0],
+}
+
+RENDERERS = {
+    'generate_html': lambda converter, questions, args: converter.generate_html(questions, 'Bench', '60', 'GK'),
+    'iter_html': lambda converter, questions, args: ''.join(converter.iter_html(questions, 'Bench', '60', 'GK')),
+    'iter_chunks': lambda converter, questions, args: ''.join(converter.iter_chunks(questions)),
+    'iter_variants': lambda converter, questions, args: ''.join(
+        html for _, html in converter.iter_variants(questions, 'Bench', '60', 'GK', range(args.variants))
+    ),
+}
+
+
+def bench_suite(args):
+    # Every parser and renderer of QuizConverter on synthetic banks. Sizes
+    # of 100000 questions or more are timed once instead of --repeat times.
+    converter = QuizConverter()
+    result = {'run': run_info(args), 'parse': [], 'render': []}
+    for language in args.languages:
+        for size in args.sizes:
+            data = make_txt(size, language, seed=size)
+            repeat = args.repeat if size < 100000 else 1
+            for method, parse in PARSERS.items():
+                seconds = best_of(repeat, parse, converter, data)
+                record = {
+                    'method': method, 'language': language, 'questions': size, 'inputBytes': len(data),
+                    'seconds': round(seconds, 6),
+                    'questionsPerSecond': round(size / seconds, 1),
+                    'mbPerSecond': round(len(data) / 1024 / 1024 / seconds, 3)
+                }
+                if args.memory:
+                    record['peakBytes'] = peak_memory(parse, converter, data)[0]
+                result['parse'].append(record)
+                print(f'{language} {size:>8} {method:<18} {seconds * 1000:>10.1f} ms', file=sys.stderr)
+
+            questions = converter.parse_table(io.BytesIO(data))
+            for method, render in RENDERERS.items():
+                seconds = best_of(repeat, render, converter, questions, args)
+                output = render(converter, questions, args)
+                record = {
+                    'method': method, 'language': language, 'questions': size,
+                    'seconds': round(seconds, 6), 'outputBytes': len(output.encode('utf-8'))
+                }
+                if args.memory:
+                    record['peakBytes'] = peak_memory(render, converter, questions, args)[0]
+                result['render'].append(record)
+                print(f'{language} {size:>8} {method:<18} {seconds * 1000:>10.1f} ms', file=sys.stderr)
+    write_json(result, args.output)
+
+
+def bench_load(args):
+    # POSTs --requests bodies to /generate, cycling through --distinct banks
+    # so the first --distinct requests miss the quiz cache and the rest hit
+    # it. Without --url the app runs in-process behind Flask's test client.
+    bodies = [
+        json.dumps({
+            'txtContent': make_txt(args.size, args.language, seed).decode('utf-8'),
+            'testName': f'Bench {seed}', 'duration': '60', 'category': 'GK'
+        }, ensure_ascii=False).encode('utf-8')
+        for seed in range(args.distinct)
+    ]
+    path = '/generate' + (f'?{args.query}' if args.query else '')
+    local = threading.local()
+
+    def post(body):
+        if args.url:
+            http_request = urllib.request.Request(
+                args.url.rstrip('/') + path, data=body, headers={'Content-Type': 'application/json'}
+            )
+            try:
+                with urllib.request.urlopen(http_request) as response:
+                    return response.status, len(response.read())
+            except urllib.error.HTTPError as e:
+                return e.code, len(e.read())
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        response = local.client.post(path, data=body, content_type='application/json')
+        return response.status_code, len(response.data)
+
+    def timed_post(n):
+        start = time.perf_counter()
+        status, size = post(bodies[n % len(bodies)])
+        return time.perf_counter() - start, status, size
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        samples = list(pool.map(timed_post, range(args.requests)))
+    total = time.perf_counter() - start
+
+    latencies = sorted(seconds * 1000 for seconds, _, _ in samples)
+    statuses = {}
+    for _, status, _ in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))], 3)
+
+    result = {
+        'run': run_info(args),
+        'load': {
+            'target': args.url or 'test_client',
+            'requests': args.requests,
+            'seconds': round(total, 6),
+            'requestsPerSecond': round(args.requests / total, 1),
+            'requestBytes': sum(len(body) for body in bodies) // len(bodies),
+            'responseBytes': sum(size for _, _, size in samples),
+            'statuses': statuses,
+            'latencyMs': {
+                'p50': percentile(50), 'p90': percentile(90), 'p99': percentile(99),
+                'max': round(latencies[-1], 3),
+                'mean': round(sum(latencies) / len(latencies), 3)
+            }
+        }
+    }
+    write_json(result, args.output)
+
+
+def flatten(result):
+    # {metric name: value} of the timings in a suite or load result.
+    values = {}
+    for section in ('parse', 'render'):
+        for record in result.get(section, []):
+            name = f"{section} {record['method']} {record['language']} {record['questions']}"
+            values[f'{name} ms'] = record['seconds'] * 1000
+            if 'peakBytes' in record:
+                values[f'{name} peak MB'] = record['peakBytes'] / 1024 / 1024
+    if 'load' in result:
+        values['load requests/s'] = result['load']['requestsPerSecond']
+        for stat, ms in result['load']['latencyMs'].items():
+            values[f'load {stat} ms'] = ms
+    return values
+
+
+def bench_compare(args):
+    with open(args.old, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(args.new, encoding='utf-8') as f:
+        new = json.load(f)
+    old_values = flatten(old)
+    new_values = flatten(new)
+    print(f"{old['run']['commit'] or args.old} -> {new['run']['commit'] or args.new}")
+    width = max((len(name) for name in old_values), default=10)
+    for name, before in old_values.items():
+        if name not in new_values:
+            continue
+        after = new_values[name]
+        change = (after - before) / before * 100 if before else 0.0
+        print(f'{name:<{width}}  {before:>12.3f}  {after:>12.3f}  {change:>+8.1f}%')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    render = commands.add_parser('render', help='time QuizConverter.generate_html')
+    render.add_argument('--sizes', type=lambda v: [int(x) for x in v.split(',')], default=[10, 1000, 100000])
+    render.add_argument('--repeat', type=int, default=5)
+    render.set_defaults(func=bench_render)
+
+    variants = commands.add_parser('variants', help='time QuizConverter.iter_variants against one render')
+    variants.add_argument('--size', type=int, default=1000)
+    variants.add_argument('--count', type=int, default=500)
+    variants.set_defaults(func=bench_variants)
+
+    parse = commands.add_parser('parse', help='time parse_parallel against a serial parse')
+    parse.add_argument('--size', type=int, default=200000)
+    parse.add_argument('--workers', type=lambda v: [int(x) for x in v.split(',')], default=[1, 2, 4, 8])
+    parse.add_argument('--repeat', type=int, default=3)
+    parse.set_defaults(func=bench_parse)
+
+    serialize = commands.add_parser('serialize', help='time the embedded JSON and envelope serializers')
+    serialize.add_argument('--sizes', type=lambda v: [int(x) for x in v.split(',')], default=[1000, 100000])
+    serialize.add_argument('--languages', type=lambda v: v.split(','), default=['hi', 'en'])
+    serialize.add_argument('--repeat', type=int, default=3)
+    serialize.set_defaults(func=bench_serialize)
+
+    suite = commands.add_parser('suite', help='time every QuizConverter parser and renderer, as JSON')
+    suite.add_argument('--sizes', type=lambda v: [int(x) for x in v.split(',')], default=[10, 1000, 100000])
+    suite.add_argument('--languages', type=lambda v: v.split(','), default=['hi', 'en'])
+    suite.add_argument('--repeat', type=int, default=3)
+    suite.add_argument('--variants', type=int, default=5, help='variants rendered by the iter_variants case')
+    suite.add_argument('--no-memory', dest='memory', action='store_false', help='skip the tracemalloc peak memory runs')
+    suite.add_argument('--output', help='JSON file (default: stdout)')
+    suite.set_defaults(func=bench_suite)
+
+    load = commands.add_parser('load', help='load test POST /generate, as JSON')
+    load.add_argument('--requests', type=int, default=500)
+    load.add_argument('--distinct', type=int, default=50, help='distinct banks; the rest of the requests are cache hits')
+    load.add_argument('--size', type=int, default=100, help='questions per bank')
+    load.add_argument('--language', choices=sorted(WORDS), default='hi')
+    load.add_argument('--concurrency', type=int, default=4)
+    load.add_argument('--query', default='', help='query string for /generate, e.g. format=html')
+    load.add_argument('--url', help='base URL of a running server, e.g. a local gunicorn (default: in-process)')
+    load.add_argument('--output', help='JSON file (default: stdout)')
+    load.set_defaults(func=bench_load)
+
+    compare = commands.add_parser('compare', help='compare two suite or load JSON results')
+    compare.add_argument('old')
+    compare.add_argument('new')
+    compare.set_defaults(func=bench_compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# app reads its settings at import time: keep the tests off the real data
+# directory and on the in-process cache.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['QUIZ_DATA_DIR'] = tempfile.mkdtemp(prefix='quiz-test-data-')
+os.environ['QUIZ_CACHE_BACKEND'] = 'memory'
+os.environ.pop('QUIZ_METRICS_DIR', None)
+
+import app as quiz_app  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    return quiz_app.app.test_client()
+
+
+def make_bank(count, seed=0):
+    # A well-formed TXT bank: ids 1..count, answers 1-4, every other
+    # question without a solution.
+    import random
+    rng = random.Random(seed)
+    blocks = []
+    for n in range(1, count + 1):
+        lines = [str(n), f'प्रश्न {n}: {rng.random()}?'] + [f'विकल्प {n}.{o}' for o in range(1, 5)]
+        lines.append(str(rng.randint(1, 4)))
+        if n % 2:
+            lines.append(f'समाधान {n}')
+        blocks.append('\n'.join(lines))
+    return '\n---\n'.join(blocks) + '\n'
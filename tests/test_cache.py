@@ -0,0 +1,93 @@
+import gzip
+
+import pytest
+
+import app as quiz_app
+from app import QuizCache, SQLiteQuizCache, new_entry
+from conftest import make_bank
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_cache(request, tmp_path):
+    def make(**limits):
+        if request.param == 'memory':
+            return QuizCache(**limits)
+        return SQLiteQuizCache(str(tmp_path / 'cache'), **limits)
+    return make
+
+
+def test_evicts_least_recently_used_entry(make_cache):
+    cache = make_cache(max_entries=2)
+    cache.put('a', new_entry('<p>a</p>', 1))
+    cache.put('b', new_entry('<p>b</p>', 1))
+    assert cache.get('a')['html'] == '<p>a</p>'
+    if hasattr(cache, 'flush'):
+        cache.flush()
+    cache.put('c', new_entry('<p>c</p>', 1))
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+    assert cache.get('c') is not None
+    assert cache.stats()['evictions'] == 1
+
+
+def test_evicts_by_size(make_cache):
+    cache = make_cache(max_bytes=30000)
+    cache.put('a', new_entry('a' * 12000, 1))
+    cache.put('b', new_entry('b' * 12000, 1))
+    cache.put('c', new_entry('c' * 12000, 1))
+    assert cache.get('a') is None
+    assert cache.stats()['entries'] == 2
+    assert cache.stats()['bytes'] <= 30000
+    cache.put('huge', new_entry('x' * 40000, 1))
+    assert cache.get('huge') is None
+
+
+def test_entry_round_trip_with_chunks(make_cache):
+    cache = make_cache()
+    diagnostics = [{'line': 4, 'severity': 'warning', 'message': 'm'}]
+    cache.put('k', new_entry('<p>page</p>', 3, diagnostics, ['[1]', '[2]'], offline=True))
+    entry = cache.get('k')
+    assert entry['html'] == '<p>page</p>'
+    assert entry['questions_count'] == 3
+    assert entry['diagnostics'] == {'diagnostics': diagnostics, 'errorCount': 0, 'warningCount': 1}
+    assert entry['chunks'] == ['[1]', '[2]']
+    assert entry['offline'] is True
+    assert cache.get_chunk('k', 2) == ('[2]', {})
+    assert cache.get_chunk('k', 3) is None
+    assert cache.get_chunk('missing', 1) is None
+
+
+def test_put_encoded_adds_a_variant(make_cache):
+    cache = make_cache()
+    cache.put('k', new_entry('<p>page</p>', 1, chunks=['[1]']))
+    size = cache.stats()['bytes']
+    cache.put_encoded('k', 'html', 'gzip', b'gz-page')
+    cache.put_encoded('k', 'chunk1', 'gzip', b'gz-chunk')
+    cache.put_encoded('k', 'html', 'gzip', b'ignored')
+    cache.put_encoded('missing', 'html', 'gzip', b'nothing')
+    assert cache.get('k')['encoded'][('html', 'gzip')] == b'gz-page'
+    body, encoded = cache.get_chunk('k', 1)
+    assert (body, encoded[('chunk1', 'gzip')]) == ('[1]', b'gz-chunk')
+    assert cache.get('missing') is None
+    assert cache.stats()['bytes'] > size
+
+
+def test_put_encoded_can_evict(make_cache):
+    cache = make_cache(max_bytes=30000)
+    cache.put('a', new_entry('a' * 10000, 1))
+    cache.put('b', new_entry('b' * 10000, 1))
+    cache.put_encoded('b', 'html', 'gzip', b'z' * 15000)
+    assert cache.get('a') is None
+    assert cache.get('b')['encoded'][('html', 'gzip')] == b'z' * 15000
+
+
+def test_compressed_variant_is_made_once_and_cached(client, monkeypatch):
+    body = {'txtContent': make_bank(10, seed=99)}
+    first = client.post('/generate', json=body, headers={'Accept-Encoding': 'gzip'})
+    assert first.headers['Content-Encoding'] == 'gzip'
+    compressed = []
+    monkeypatch.setattr(quiz_app, 'compress_text', lambda *args, **kwargs: compressed.append(args))
+    second = client.post('/generate', json=body, headers={'Accept-Encoding': 'gzip'})
+    assert compressed == []
+    assert second.data == first.data
+    assert gzip.decompress(second.data) == client.post('/generate', json=body).data
@@ -0,0 +1,122 @@
+import io
+import random
+
+import pytest
+
+import app as quiz_app
+from app import NO_SOLUTION, QuestionTable, converter, parse_parallel, process_pool, split_blocks
+from conftest import make_bank
+
+
+def old_parse_txt_content(txt_content):
+    # The splitter parse_txt_content replaced, kept as the reference.
+    questions = []
+    for block in txt_content.split('---'):
+        block = block.strip()
+        if not block:
+            continue
+        lines = [line.strip() for line in block.split('\n') if line.strip()]
+        if len(lines) >= 7:
+            questions.append({
+                'id': int(lines[0]),
+                'text': lines[1],
+                'options': lines[2:6],
+                'correct_option': lines[6],
+                'solution': lines[7] if len(lines) > 7 else NO_SOLUTION
+            })
+    return questions
+
+
+def random_bank(rng):
+    # Messy input: blank and indented lines, CRLF, '---' in the middle of a
+    # line, short blocks that are skipped, extra lines, answers outside 1-4
+    # and the odd block that does not start with a number.
+    words = ['क', 'ख', 'abc', 'x y', '<b>b</b>', '\t', '  ', '-', '\u2028', '\x85', 'é']
+    blocks = []
+    for n in range(rng.randint(0, 30)):
+        lines = [str(rng.randint(-5, 500)) if rng.random() < 0.995 else 'x']
+        for _ in range(rng.choice([1, 5, 6, 7, 8, 9])):
+            lines.append(''.join(rng.choice(words) for _ in range(rng.randint(1, 4))))
+        if rng.random() < 0.3:
+            lines.insert(rng.randint(1, len(lines)), '')
+        if len(lines) > 6 and rng.random() < 0.8:
+            lines[6] = rng.choice(['1', '2', '3', '4', '0', '5', 'A'])
+        newline = rng.choice(['\n', '\r\n', '\n\n'])
+        blocks.append(newline.join(rng.choice(['', ' ', '  ']) + line for line in lines))
+    separators = ['\n---\n', '---', '\n---', ' --- ', '\n\n---\n\n']
+    text = ''
+    for block in blocks:
+        text += block + rng.choice(separators)
+    return text
+
+
+@pytest.mark.parametrize('seed', range(300))
+def test_parse_txt_content_matches_old_splitter(seed):
+    text = random_bank(random.Random(seed))
+    try:
+        expected = old_parse_txt_content(text)
+    except ValueError:
+        # A block whose first line is not a number: both refuse the file.
+        with pytest.raises(Exception, match='TXT पार्स करने में त्रुटि'):
+            converter.parse_txt_content(text)
+        with pytest.raises(Exception, match='TXT पार्स करने में त्रुटि'):
+            converter.parse_table(io.BytesIO(text.encode('utf-8')))
+        return
+    assert converter.parse_txt_content(text) == expected
+    assert converter.parse_stream(io.BytesIO(text.encode('utf-8'))) == expected
+
+    table = converter.parse_table(io.BytesIO(text.encode('utf-8')))
+    reference = QuestionTable.from_questions(expected)
+    assert table.ids == reference.ids
+    assert table.texts == reference.texts
+    assert table.options == reference.options
+    assert table.answers == reference.answers
+    assert table.solutions == reference.solutions
+
+
+def test_parse_errors_match_old_splitter():
+    text = 'x\nq\na\nb\nc\nd\n1'
+    with pytest.raises(ValueError):
+        old_parse_txt_content(text)
+    with pytest.raises(Exception, match='TXT पार्स करने में त्रुटि'):
+        converter.parse_txt_content(text)
+
+
+def test_bom_is_ignored_by_every_parser():
+    text = make_bank(5)
+    data = b'\xef\xbb\xbf' + text.encode('utf-8')
+    expected = converter.parse_txt_content(text)
+    assert converter.parse_txt_content('\ufeff' + text) == expected
+    assert converter.parse_stream(io.BytesIO(data)) == expected
+    assert list(converter.parse_table(io.BytesIO(data))) == list(converter.parse_table(io.BytesIO(text.encode('utf-8'))))
+
+
+@pytest.mark.parametrize('chunk_bytes', [1, 100, 1000, 10 ** 9])
+def test_split_blocks_pieces_parse_to_the_same_questions(chunk_bytes):
+    data = make_bank(60, seed=chunk_bytes).encode('utf-8')
+    serial = converter.parse_table(io.BytesIO(data))
+    merged = QuestionTable()
+    for piece in split_blocks(data, chunk_bytes):
+        merged.extend(converter.parse_table(io.BytesIO(piece)))
+    assert list(merged) == list(serial)
+
+
+def test_parse_parallel_matches_serial_parse():
+    text = make_bank(400, seed=1) + '\n---\n' + random_bank(random.Random(7))
+    data = b'\xef\xbb\xbf' + text.encode('utf-8')
+    serial = converter.parse_table(io.BytesIO(data))
+    progress = []
+    with process_pool(2) as pool:
+        parallel = parse_parallel(data, pool, chunk_bytes=2048, progress=progress.append)
+    assert list(parallel) == list(serial)
+    assert parallel.answers == serial.answers
+    assert progress[-1] == len(serial)
+    assert progress == sorted(progress)
+
+
+def test_use_parallel_parse_needs_more_than_one_usable_cpu(monkeypatch):
+    monkeypatch.setattr(quiz_app, 'usable_cpus', lambda: 1)
+    assert not quiz_app.use_parallel_parse(quiz_app.PARALLEL_PARSE_BYTES)
+    monkeypatch.setattr(quiz_app, 'usable_cpus', lambda: 4)
+    assert quiz_app.use_parallel_parse(quiz_app.PARALLEL_PARSE_BYTES)
+    assert not quiz_app.use_parallel_parse(quiz_app.PARALLEL_PARSE_BYTES - 1)
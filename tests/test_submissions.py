@@ -0,0 +1,94 @@
+import io
+import json
+import re
+import zipfile
+
+import pytest
+
+from app import OPTION_ORDERS, answer_key_bytes, base_answers, converter, score_answers, variant_layout
+from conftest import make_bank
+
+
+def page_answer_key(html):
+    return json.loads(re.search(r'const answerKey = (\[[^\]]*\]);', html).group(1))
+
+
+def submit_path(html):
+    return '/' + re.search(r'quizzes/[0-9a-f]{64}/submissions', html).group(0)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 12345, 2 ** 31 - 1])
+def test_variant_answers_map_back_to_the_base_key(seed):
+    questions = converter.parse_table(io.StringIO(make_bank(40, seed)))
+    answer_key = answer_key_bytes(questions)
+    layout = variant_layout(len(questions), seed)
+    order, picks = layout
+    assert sorted(order) == list(range(len(questions)))
+
+    # What a candidate who gets everything right picks on the variant page.
+    given = bytes(OPTION_ORDERS[picks[n]].index(answer_key[order[n]] - 1) + 1 for n in range(len(questions)))
+    assert base_answers(given, layout) == answer_key
+    assert base_answers(b'', layout) == bytes(len(questions))
+
+
+def test_rendered_variants_match_their_layout():
+    questions = converter.parse_table(io.StringIO(make_bank(30)))
+    answer_key = answer_key_bytes(questions)
+    for seed, html in converter.iter_variants(questions, 'T', '10', 'C', range(5, 8)):
+        given = bytes(page_answer_key(html))
+        assert base_answers(given, variant_layout(len(questions), seed)) == answer_key
+
+
+def test_score_answers():
+    answer_key = bytes([1, 2, 3, 4, 0xff])
+    assert score_answers(answer_key, bytes([1, 2, 3, 4, 1])) == (4, 1, 0)
+    assert score_answers(answer_key, bytes([1, 0, 4])) == (1, 1, 3)
+    assert score_answers(answer_key, b'') == (0, 0, 5)
+
+
+def test_variant_submissions_are_scored_against_the_base_key(client):
+    response = client.post('/variants?submit=1', json={'txtContent': make_bank(20), 'count': 3, 'seed': 100})
+    assert response.status_code == 200
+    token = response.headers['X-Quiz-Owner-Token']
+    pages = zipfile.ZipFile(io.BytesIO(response.data))
+    html = pages.read('variant-101.html').decode('utf-8')
+    path = submit_path(html)
+    answers = page_answer_key(html)
+
+    result = client.post(f'{path}?variant=101', json={'answers': answers}).get_json()['result']
+    assert (result['score'], result['total'], result['variant']) == (20, 20, 101)
+
+    bulk = client.post(path, json={'submissions': [
+        {'answers': answers, 'variant': 101},
+        {'answers': answers, 'variant': 100},
+        {'answers': [None] * 20, 'variant': 102}
+    ]}).get_json()['results']
+    assert bulk[0]['score'] == 20
+    assert bulk[1]['score'] < 20
+    assert bulk[2]['skipped'] == 20
+
+    listing = client.get(path, headers={'X-Quiz-Owner-Token': token}).get_json()
+    assert listing['total'] == 4
+
+
+@pytest.mark.parametrize('variant', [99, 103, -1, True, '101'])
+def test_only_issued_variants_are_accepted(client, variant):
+    response = client.post('/variants?submit=1', json={'txtContent': make_bank(5), 'count': 3, 'seed': 100})
+    path = submit_path(zipfile.ZipFile(io.BytesIO(response.data)).read('variant-100.html').decode('utf-8'))
+    assert client.post(path, json={'answers': [1] * 5, 'variant': variant}).status_code == 400
+
+
+def test_submit_mode_keys_and_tokens_are_not_reproducible(client):
+    body = {'txtContent': make_bank(5), 'testName': 'Mock 1'}
+    first = client.post('/generate?submit=1', json=body)
+    second = client.post('/generate?submit=1', json=body)
+    first_path = submit_path(first.get_json()['html'])
+    assert first_path != submit_path(second.get_json()['html'])
+
+    client.post(first_path, json={'answers': [1] * 5, 'candidate': 'Alice'})
+    stolen = {'X-Quiz-Owner-Token': second.headers['X-Quiz-Owner-Token']}
+    owner = {'X-Quiz-Owner-Token': first.headers['X-Quiz-Owner-Token']}
+    assert client.get(first_path, headers=stolen).status_code == 403
+    assert client.get(first_path.replace('submissions', 'analytics')).status_code == 403
+    assert client.get(first_path, headers=owner).get_json()['submissions'][0]['candidate'] == 'Alice'
+    assert client.get(first_path.replace('submissions', 'analytics'), headers=owner).get_json()['attempts'] == 1